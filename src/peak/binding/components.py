@@ -16,6 +16,7 @@ from peak.config.interfaces import IConfigKey, IConfigurationRoot, \
 from peak.config.registries import ImmutableConfig
 from peak.util.imports import importString, whenImported
 from peak.util.decorators import decorate
+from peak.util import startup_profile
 
 __all__ = [
     'Component', 'Obtain', 'Require', 'Delegate', 'Configurable',
@@ -1000,8 +1001,19 @@ class Component(_Base):
                     tba.append(ob)
                     raise
 
+            profiler = startup_profile.profiler
+
             for attr in self.__class__.__attrsToBeAssembled__:
-                getattr(self,attr)
+                if profiler is None:
+                    getattr(self,attr)
+                    continue
+                profiler.begin('assembly', '%s (%s.%s)' % (
+                    getComponentPath(self), self.__class__.__name__, attr
+                ))
+                try:
+                    getattr(self,attr)
+                finally:
+                    profiler.end()
 
         except:
             self.__objectsToBeAssembled__ = tba
@@ -17,7 +17,8 @@ __all__ = [
     'ConfigMap', 'LazyRule', 'fileNearModule', 'packageFile', 'IniLoader',
     'Value', 'iterKeys', 'Namespace', 'iterValues',
     'CreateViaFactory', 'parentsProviding', 'parentProviding', 'lookup',
-    'ServiceArea', 'XMLKey', 'processXML', 'XMLParser', 'getStreamFactory'
+    'ServiceArea', 'XMLKey', 'processXML', 'XMLParser', 'getStreamFactory',
+    'lookupCacheStats',
 ]
 
 
@@ -430,6 +431,34 @@ def parentProviding(component, protocol, default=NOT_GIVEN):
     return default
 
 
+def lookupCacheStats(component):
+
+    """Return '(hits,misses)' for the lookup caches used by 'component'
+
+    This totals the hit and miss counts of the configuration maps (both
+    class-level and instance-level) of 'component' and its parents, so you
+    can see how well configuration lookups are being memoized."""
+
+    hits = misses = 0
+    seen = {}
+
+    for ob in iterParents(component):
+
+        try:
+            maps = ob._config_maps()
+        except AttributeError:
+            maps = [getattr(ob.__class__,'__class_offers__',None)]
+
+        for m in maps:
+            if m is None or id(m) in seen:
+                continue
+            seen[id(m)] = m
+            hits += getattr(m,'hits',0)
+            misses += getattr(m,'misses',0)
+
+    return hits, misses
+
+
 def iterKeys(component, configKey):
 
     """Iterate sub-keys of 'configKey' that are available from 'component'"""
@@ -492,7 +521,10 @@ class CreateViaFactory(object):
 
 class ConfigMap(Component):
 
-    rules = depth = keyIndex = lockedNamespaces = Make(dict)
+    rules = depth = keyIndex = lockedNamespaces = lookupCache = Make(dict)
+
+    lookupCacheSize = 1000  # max. keys in 'lookupCache'; emptied when full
+    hits = misses = 0
 
     protocols.advise(
         instancesProvide=[IConfigurable]
@@ -580,9 +612,30 @@ class ConfigMap(Component):
         value  = NOT_FOUND
         xRules = []
 
-        for name in configKey.lookupKeys():
+        # 'lookupCache' maps each key to its '[name,cell]' pairs.  A rule's
+        # cell is never replaced, and can't be changed once it has been read
+        # ('AlreadyRead'), so cached cells never go stale; names with no cell
+        # yet are checked again until they have one.
+
+        cache = self.lookupCache
+        entries = cache.get(configKey)
 
-            rule = rules.get(name)
+        if entries is None:
+            self.misses += 1
+            if len(cache)>=self.lookupCacheSize:
+                cache.clear()
+            entries = cache[configKey] = [
+                [name,None] for name in configKey.lookupKeys()
+            ]
+        else:
+            self.hits += 1
+
+        for entry in entries:
+
+            name, rule = entry
+
+            if rule is None:
+                rule = entry[1] = rules.get(name)
 
             if rule is None:
                 xRules.append(name)     # track unspecified rules
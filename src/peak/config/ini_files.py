@@ -1,25 +1,40 @@
 from peak.api import *
 from peak.util.imports import importString, importObject, whenImported
 from peak.util.FileParsing import AbstractConfigParser
+from peak.util.FileParsing import fromStream, iterConfigSections
+from peak.util.FileParsing import iterConfigSettings
+from peak.util import startup_profile
 from interfaces import *
 from config_components import FactoryFor, CreateViaFactory, LazyRule, Value
-import re; from peak.api import iif
+from types import CodeType
+import re, os, imp, marshal; from peak.api import iif
 
 __all__ = [
     'ConfigReader', 'loadConfigFiles', 'loadConfigFile', 'loadMapping',
-    'ruleForExpr',
+    'ruleForExpr', 'compileConfigFile', 'writeConfigCache',
 ]
 
 SECTION_PARSERS = PropertyName('peak.config.iniFile.sectionParsers')
 CONFIG_LOADERS  = PropertyName('peak.config.loaders')
 isIdentifier = re.compile('^[A-Za-z_][A-Za-z0-9_]*$').match
 
+CACHE_ENVIRON = 'PEAK_CONFIG_CACHE'   # directory for precompiled .ini files
+CACHE_FORMAT  = 1                     # change when the cache format changes
+
+def compileExpr(expr):
+    """Compile rule expression 'expr' the way 'eval()' would"""
+    return compile(expr.lstrip(' \t'), '<string>', 'eval')
+
 def ruleForExpr(name,expr,globalDict):
-    """Return 'config.IRule' for property 'name' based on 'expr' string"""
+    """Return 'config.IRule' for property 'name' based on 'expr'
+
+    'expr' is an expression string, or a code object compiled from one.  A
+    string is compiled the first time the rule is used."""
 
     _ruleName = PropertyName(name)
     _rulePrefix = _ruleName.asPrefix()
     _lrp = len(_rulePrefix)
+    _code = [expr]
 
     def f(propertyMap, configKey, targetObj):
         ruleName = _ruleName
@@ -27,7 +42,10 @@ def ruleForExpr(name,expr,globalDict):
         if isinstance(configKey,PropertyName):
             propertyName = configKey
             ruleSuffix = propertyName[_lrp:]
-        result = eval(expr,globalDict,locals())
+        code = _code[0]
+        if not isinstance(code,CodeType):
+            code = _code[0] = compileExpr(code)
+        result = eval(code,globalDict,locals())
         rule = adapt(result,ISmartProperty,None)
         if rule is not None:
             result = rule.computeProperty(
@@ -53,17 +71,188 @@ def loadConfigFile(pMap, filename, prefix='*', includedFrom=None):
     if filename:
         factory = config.getStreamFactory(pMap,filename)
         if factory.exists():
-            stream = factory.open('t')
+            profiler = startup_profile.profiler
+            if profiler is not None:
+                profiler.begin('ini', factory.address)
             try:
-                globalDict = getattr(includedFrom,'globalDict',None)
-                reader = ConfigReader(pMap,prefix,globalDict)
-                reader.readStream(stream,factory.address)
+                _loadFactory(pMap, factory, prefix, includedFrom)
             finally:
-                stream.close()       
+                if profiler is not None:
+                    profiler.end()
 
 protocols.adviseObject(loadConfigFile, provides=[ISettingLoader])
 
 
+def _loadFactory(pMap, factory, prefix, includedFrom):
+
+    globalDict = getattr(includedFrom,'globalDict',None)
+    reader = ConfigReader(pMap,prefix,globalDict)
+    sections = _cachedSections(factory)
+
+    if sections is not None:
+        reader.readSections(sections)
+        return
+
+    stream = factory.open('t')
+    try:
+        reader.readStream(stream,factory.address)
+    finally:
+        stream.close()
+
+
+def compileConfigFile(factory):
+
+    """Parse the .ini file from stream factory 'factory' for caching
+
+    Returns a list of '(section,settings,lineInfo)' tuples, where 'settings'
+    is a list of '(name,value,lineInfo,code)' tuples.  'code' is the setting
+    compiled as a rule expression, if it's in an ordinary section (and
+    compiles); otherwise it's 'None'.  'ConfigReader.readSections()' loads
+    the result exactly as if the file itself had been read."""
+
+    sections = []
+    stream = factory.open('t')
+
+    try:
+        for section, lines, info in iterConfigSections(
+            fromStream(stream, factory.address)
+        ):
+            plain = section is None or len(section.split())<=1
+            settings = []
+
+            for name, value, lineInfo in iterConfigSettings(lines):
+                code = None
+                if plain and name is not None:
+                    try:
+                        code = compileExpr(value)
+                    except SyntaxError:
+                        pass    # report it when the rule is used, as usual
+                settings.append((name, value, lineInfo, code))
+
+            sections.append((section, settings, info))
+    finally:
+        stream.close()
+
+    return sections
+
+
+def _localFilename(factory):
+
+    """Return the local file 'factory' reads, or 'None'"""
+
+    filename = getattr(factory,'filename',None)
+
+    if filename is None and hasattr(factory,'moduleName'):
+        # Package data, via 'config.packageFile()'; only cache real files
+        import pkg_resources
+        if isinstance(
+            pkg_resources.get_provider(factory.moduleName),
+            pkg_resources.DefaultProvider
+        ):
+            filename = pkg_resources.resource_filename(
+                factory.moduleName, factory.path
+            )
+
+    if filename is not None:
+        return os.path.abspath(filename)
+
+
+def _cacheInfo(factory):
+
+    """Return '(cachePath,header)' for 'factory', or 'None' if uncachable
+
+    The header identifies the source file by path, modification time, and
+    size, along with the cache format and Python bytecode version."""
+
+    cacheDir = os.environ.get(CACHE_ENVIRON)
+    if not cacheDir:
+        return None
+
+    filename = _localFilename(factory)
+    if filename is None:
+        return None
+
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+
+    cachePath = os.path.join(cacheDir, '%s-%08x.inic' % (
+        os.path.basename(filename), hash(filename) & 0xFFFFFFFFL
+    ))
+
+    return cachePath, (
+        CACHE_FORMAT, imp.get_magic(), filename, st.st_mtime, st.st_size
+    )
+
+
+def writeConfigCache(factory):
+
+    """Precompile the .ini file from 'factory' into the cache directory
+
+    The cache directory is given by the 'PEAK_CONFIG_CACHE' environment
+    variable.  Returns the path of the cache file written, or 'None' if
+    caching is disabled or 'factory' isn't a local file."""
+
+    info = _cacheInfo(factory)
+    if info is not None:
+        _writeCache(info[0], info[1], compileConfigFile(factory))
+        return info[0]
+
+
+def _writeCache(cachePath, header, sections):
+
+    # Write to a temporary file and rename it, so that other processes never
+    # see a partially-written cache
+    tmpPath = '%s.%d' % (cachePath, os.getpid())
+    f = open(tmpPath,'wb')
+
+    try:
+        marshal.dump((header,sections), f)
+    finally:
+        f.close()
+
+    try:
+        os.rename(tmpPath, cachePath)
+    except OSError:
+        os.remove(cachePath)    # Windows won't rename over an existing file
+        os.rename(tmpPath, cachePath)
+
+
+def _cachedSections(factory):
+
+    """Return cached 'compileConfigFile()' data for 'factory', or 'None'
+
+    A stale or missing cache file is rebuilt (if possible) and its data
+    returned.  'None' means caching is disabled or 'factory' isn't a local
+    file."""
+
+    info = _cacheInfo(factory)
+    if info is None:
+        return None
+
+    try:
+        f = open(info[0],'rb')
+        try:
+            header, sections = marshal.load(f)
+        finally:
+            f.close()
+    except (IOError, EOFError, ValueError, TypeError):
+        pass
+    else:
+        if header==info[1]:
+            return sections
+
+    sections = compileConfigFile(factory)
+
+    try:
+        _writeCache(info[0], info[1], sections)
+    except (IOError, OSError):
+        pass    # e.g. read-only cache directory; just don't cache
+
+    return sections
+
+
 def loadConfigFiles(pMap, filenames, prefix='*', includedFrom=None):
 
     if not filenames:
@@ -95,13 +284,23 @@ class ConfigReader(AbstractConfigParser):
 
     def add_setting(self, section, name, value, lineInfo):
         _ruleName = PropertyName(section+name)
+        rule = ruleForExpr(_ruleName,value,self.globalDict)
 
-        self.pMap.registerProvider(
-            _ruleName,
-            ruleForExpr(_ruleName,value,self.globalDict)
-        )
+        profiler = startup_profile.profiler
+        if profiler is not None:
+            label = '%s:%s (%s)' % (lineInfo[0], lineInfo[1], _ruleName)
+            rule = profiler.timed('rule', label, rule)
+
+        self.pMap.registerProvider(_ruleName, rule)
 
     def add_section(self, section, lines, lineInfo):
+        section, handler = self._handlerFor(section, lineInfo)
+        self.process_settings(section, lines, handler)
+
+
+    def _handlerFor(self, section, lineInfo):
+
+        """Return '(section,handler)' for processing 'section''s settings"""
 
         if section is None:
             section='*'
@@ -119,7 +318,22 @@ class ConfigReader(AbstractConfigParser):
             section = self.prefix + PropertyName(section).asPrefix()
             handler = self.add_setting
 
-        self.process_settings(section, lines, handler)
+        return section, handler
+
+
+    def readSections(self, sections):
+
+        """Read parsed sections, as returned by 'compileConfigFile()'
+
+        Settings that were compiled are given to 'add_setting()' as code
+        objects instead of strings."""
+
+        for section, settings, lineInfo in sections:
+            section, handler = self._handlerFor(section, lineInfo)
+            for name, value, lineInfo, code in settings:
+                if code is not None:
+                    value = code
+                handler(section, name, value, lineInfo)
 
     def add_global(self,name,value):
 
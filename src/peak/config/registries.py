@@ -246,11 +246,15 @@ whenImported('zope.interface',
 
 class ImmutableConfig(object):
 
+    hits = misses = 0
+    cacheSize = 1000    # max. cached lookups; the cache is emptied when full
+
     def __init__(self, baseMaps=(), items=()):
 
         self.depth = depths = {}
         self.keysIndex = keysIndex = {}
         self.data = data = {}
+        self.cache = {}
 
         for base in baseMaps:
             adapt(base,ImmutableConfig)
@@ -286,11 +290,30 @@ class ImmutableConfig(object):
 
 
     def lookup(self, configKey, failObj=None):
-        data = self.data
-        for key in configKey.lookupKeys():
-            if key in data:
-                return data[key]
-        return failObj
+
+        # Our contents never change, so lookups can be memoized
+        cache = self.cache
+        value = cache.get(configKey, cache)
+
+        if value is cache:
+            self.misses += 1
+            if len(cache)>=self.cacheSize:
+                cache.clear()
+
+            value = NOT_FOUND
+            data = self.data
+            for key in configKey.lookupKeys():
+                if key in data:
+                    value = data[key]
+                    break
+
+            cache[configKey] = value
+        else:
+            self.hits += 1
+
+        if value is NOT_FOUND:
+            return failObj
+        return value
 
 
     def _configKeysMatching(self, configKey):
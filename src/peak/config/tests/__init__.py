@@ -121,6 +121,63 @@ class PropertyTest(TestCase):
         assert config.lookup(obj,'foo.bar.spam') is testRoot
         assert config.lookup(obj,'foo.bar.baz') is testRoot
 
+    def checkConfigCache(self):
+
+        import os, tempfile, shutil
+        from peak.config.ini_files import CACHE_ENVIRON, writeConfigCache
+
+        tmp = tempfile.mkdtemp()
+        old = os.environ.get(CACHE_ENVIRON)
+        os.environ[CACHE_ENVIRON] = tmp
+        name = 'peak.config.tests.cached.x'
+
+        def load():
+            obj = binding.Configurable(testRoot())
+            config.loadConfigFile(obj, ini)
+            return config.lookup(obj,name)
+
+        try:
+            ini = join(tmp,'test.ini')
+            open(ini,'w').write("[peak.config.tests.cached]\nx = 6*7\n")
+            self.assertEqual(load(), 42)
+            self.assertEqual(load(), 42)    # from the cache
+
+            path = writeConfigCache(config.getStreamFactory(testRoot(),ini))
+            files = os.listdir(tmp); files.sort()
+            self.assertEqual(files, ['test.ini', os.path.basename(path)])
+
+            # Changing the file invalidates the cache
+            open(ini,'w').write("[peak.config.tests.cached]\nx = 'changed'\n")
+            self.assertEqual(load(), 'changed')
+
+        finally:
+            if old is None:
+                del os.environ[CACHE_ENVIRON]
+            else:
+                os.environ[CACHE_ENVIRON] = old
+            shutil.rmtree(tmp)
+
+    def checkLookupCache(self):
+
+        app = binding.Configurable(testRoot())
+        name = PropertyName('peak.config.tests.cached.x')
+        app.registerProvider(name,config.Value(1))
+
+        hits, misses = config.lookupCacheStats(app)
+        for i in range(3):
+            self.assertEqual(config.lookup(app,name), 1)
+        self.assertEqual(app.__instance_offers__.misses, 1)
+        self.failUnless(config.lookupCacheStats(app)[0] >= hits+2)
+
+        # Rules registered after a lookup are still found
+        app.registerProvider(
+            'peak.config.tests.cached.*', config.Value(2)
+        )
+        self.assertEqual(config.lookup(app,name), 1)
+        self.assertEqual(
+            config.lookup(app,'peak.config.tests.cached.y'), 2
+        )
+
 class A:
     pass
 
@@ -320,6 +377,18 @@ class RegUpdate(TestCase):
         assert reg3.lookup(adapt(IA,IConfigKey)) is pA
         assert reg3.lookup(adapt(IB,IConfigKey)) is pB
 
+    def checkCache(self):
+
+        reg = ImmutableConfig(items=[(IA,pA)])
+        key = adapt(IB,IConfigKey)
+        other = adapt(ISampleUtility1,IConfigKey)
+
+        assert reg.lookup(key) is pA
+        assert reg.lookup(key) is pA
+        assert reg.lookup(other) is None
+        assert reg.lookup(other,42)==42
+        self.assertEqual((reg.hits,reg.misses), (2,2))
+
 
 
 
@@ -3,6 +3,7 @@
 from interfaces import *
 from sources import *
 from event_threads import *
+from work_queues import *
 
 IS_TWISTED = 'peak.events.isTwisted'
 
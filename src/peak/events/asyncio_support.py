@@ -0,0 +1,281 @@
+"""Run 'peak.events' code on an 'asyncio' event loop, and vice versa
+
+This module provides 'IScheduler', 'ISelector' and 'IEventLoop'
+implementations that delegate to an 'asyncio' event loop ('trollius' is used
+if 'asyncio' isn't available).  To use them for a service area, set::
+
+    [peak.events]
+    scheduler = 'peak.events.asyncio_support:Scheduler'
+    selector  = 'peak.events.asyncio_support:Selector'
+    eventLoop = 'peak.events.asyncio_support:EventLoop'
+
+The loop used is the 'peak.events.asyncio.loop' property, which defaults to
+'asyncio.get_event_loop()'; set it to use some other loop implementation.
+
+Importing this module also makes 'asyncio.Future' objects (including
+'asyncio.Task' objects) adaptable to 'events.IEventSource', so that an
+'events.Task' can yield them.  'toFuture()' converts an 'IEventSource' into a
+future that a coroutine can wait on, and 'coroutineTask()' wraps a coroutine
+in an 'events.Task'.
+"""
+
+from __future__ import generators
+from peak.api import *
+from interfaces import *
+import io_events, sources
+from event_threads import Task, resume
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        raise exceptions.NameNotFound(
+            """Neither asyncio nor trollius could be imported"""
+        )
+
+__all__ = [
+    'Scheduler', 'Selector', 'EventLoop', 'toFuture', 'coroutineTask',
+    'getLoop',
+]
+
+
+def getLoop():
+    """Get the current 'asyncio' event loop (for easy reference in .ini)"""
+    return asyncio.get_event_loop()
+
+
+
+
+
+
+
+
+
+
+
+class FutureAsEventSource(protocols.Adapter):
+
+    """Adapt an 'asyncio.Future' to 'events.IEventSource'
+
+    Callbacks receive the future's result as their event, or its exception
+    instance if it failed.  Tasks that yield the future get its result from
+    'events.resume()', or have its exception re-raised there."""
+
+    protocols.advise(
+        instancesProvide=[IEventSource], asAdapterForTypes=[asyncio.Future],
+    )
+
+    def addCallback(self,func):
+
+        def done(future):
+            if future.cancelled():
+                event = asyncio.CancelledError()
+            elif future.exception() is not None:
+                event = future.exception()
+            else:
+                event = future.result()
+            func(self, event)
+
+        self.subject.add_done_callback(done)
+        return lambda: self.subject.remove_done_callback(done)
+
+
+    def nextAction(self, task=None, state=None):
+
+        future = self.subject
+
+        if state is not None:
+
+            def handler():
+                resume()
+                yield future.result()   # raises if the future failed
+
+            state.CALL(handler())
+
+            if not future.done():
+                future.add_done_callback(lambda f: task.step(self, f))
+
+        return future.done()
+
+
+
+
+
+
+def toFuture(source, loop=None):
+
+    """Return an 'asyncio.Future' for the next firing of 'source'
+
+    The future's result is the event supplied by 'source' when it fires.
+    Cancelling the future cancels the callback registered with 'source'."""
+
+    if loop is None:
+        loop = asyncio.get_event_loop()
+
+    future = asyncio.Future(loop=loop)
+
+    def fired(source,event):
+        if not future.done():
+            future.set_result(event)
+            return True
+
+    cancel = adapt(source,IEventSource).addCallback(fired)
+    future.add_done_callback(lambda f: f.cancelled() and cancel())
+    return future
+
+
+def coroutineTask(coroutine, loop=None):
+
+    """Run 'coroutine' on 'loop', returning an 'events.Task' for its result
+
+    The returned task fires with the coroutine's return value when the
+    coroutine finishes (or aborts with its exception)."""
+
+    future = asyncio.ensure_future(coroutine, loop=loop)
+
+    def wait():
+        yield future; yield resume()
+
+    return Task(wait())
+
+
+
+
+
+
+
+
+
+
+
+class Scheduler(binding.Component, events.Scheduler):
+
+    """'events.IScheduler' that uses an 'asyncio' loop for timing
+
+    Note that 'now()' is the loop's own (monotonic) time; use 'wallTime()'
+    for the time of day."""
+
+    loop     = binding.Obtain(PropertyName('peak.events.asyncio.loop'))
+    wallTime = binding.Obtain('import:time.time')
+    isEmpty  = binding.Make(lambda: events.Condition(True))
+
+    time = None     # 'peak.events.clock' is ignored; the loop has its own
+
+    def now(self):
+        return self.loop.time()
+
+    def time_available(self):
+        return 0    # the loop does its own waiting
+
+    def tick(self,stop=None):
+        """Run one iteration of the 'asyncio' loop"""
+        loop = self.loop
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+
+    def _callAt(self, what, when):
+        self.isEmpty.set(False)
+        return self.loop.call_at(when, what, self, when).cancel
+
+
+
+
+
+
+
+
+
+
+
+
+
+class EventLoop(io_events.EventLoop):
+
+    """Implement an event loop using an 'asyncio' loop's 'run_forever()'"""
+
+    loop = binding.Obtain(PropertyName('peak.events.asyncio.loop'))
+
+    def runUntil(self, eventSource, suppressErrors=False, idle=None):
+
+        loop = self.loop
+        exit = []   # holder for exit event
+        errors = []
+
+        # When event fires, record it for our return
+        adapt(eventSource,IEventSource).addCallback(
+            lambda s,e: [exit.append(e), loop.stop()]
+        )
+
+        if not suppressErrors:
+            def handler(loop, context):
+                if 'exception' in context:
+                    errors.append(context['exception'])
+                    loop.stop()
+                else:
+                    loop.default_exception_handler(context)
+
+            oldHandler = loop.get_exception_handler()
+            loop.set_exception_handler(handler)
+
+        try:
+            if not exit:
+                loop.run_forever()
+        finally:
+            if not suppressErrors:
+                loop.set_exception_handler(oldHandler)
+
+        if errors:
+            raise errors[0]
+
+        if exit:
+            return exit.pop()
+        else:
+            raise StopIteration("Unexpected loop exit")
+
+
+
+
+
+
+
+class AsyncioReadEvent(io_events.AbstractIOEvent):
+
+    __slots__ = 'loop','fd'
+
+    def __init__(self,loop,fileno):
+        super(AsyncioReadEvent,self).__init__()
+        self.fd = fileno
+        self.loop = loop
+
+    def _activate(self):
+        self.loop.add_reader(self.fd, self._fire, True)
+
+    def _deactivate(self):
+        self.loop.remove_reader(self.fd)
+
+
+class AsyncioWriteEvent(AsyncioReadEvent):
+
+    __slots__ = ()
+
+    def _activate(self):
+        self.loop.add_writer(self.fd, self._fire, True)
+
+    def _deactivate(self):
+        self.loop.remove_writer(self.fd)
+
+
+class Selector(io_events.Selector):
+
+    """Implement ISelector using an 'asyncio' loop's 'add_reader()', etc."""
+
+    loop = binding.Obtain(PropertyName('peak.events.asyncio.loop'))
+    monitor = None  # don't run a monitoring task!
+
+    def _mkEvent(self,rwe,key):
+        if rwe==2:
+            return sources.Broadcaster()    # XXX asyncio doesn't support this
+        else:
+            return [AsyncioReadEvent, AsyncioWriteEvent][rwe](self.loop,key)
@@ -7,9 +7,12 @@ import traceback
 from sources import Condition, Value, AnyOf, Observable
 import time
 from peak.util.advice import advice
+from heapq import heappush, heappop, heapify
+from itertools import count
 
 __all__ = [
-    'resume', 'taskFactory', 'Scheduler', 'Task', 'TaskState', 'Interrupt',
+    'resume', 'taskFactory', 'Scheduler', 'HeapScheduler', 'Task', 'TaskState',
+    'Interrupt',
 ]
 
 def resume():
@@ -209,8 +212,11 @@ class Scheduler(object):
 
     protocols.advise( instancesProvide=[IScheduler] )
 
-    def __init__(self, time = time.time):
+    stats = None    # 'LoopStats' to record timer statistics in, if any
+
+    def __init__(self, time = time.time, wallTime = time.time):
         self.now = time
+        self.wallTime = wallTime
         self._appointments = []
         self.isEmpty = Condition(True)
 
@@ -221,8 +227,13 @@ class Scheduler(object):
 
     def tick(self,stop=None):
         now = self.now()
+        stats = self.stats
         while self._appointments and self._appointments[0][0] <= now and not stop:
-            self._appointments.pop(0)[1](self,now)
+            when, what = self._appointments.pop(0)
+            if stats is None:
+                what(self,now)
+            else:
+                stats.callAppointment(self,what,when,now)
         self.isEmpty.set(not self._appointments)
 
     def sleep(self, secs=0):
@@ -264,6 +275,74 @@ class Scheduler(object):
         appts.insert(lo, item)
         return lambda: (item in appts) and appts.remove(item)
 
+
+class HeapScheduler(Scheduler):
+
+    """'events.IScheduler' using a binary heap for pending appointments
+
+    Behaves exactly like 'events.Scheduler', but scheduling and firing an
+    appointment take O(log n) time instead of O(n), and cancelling one is O(1).
+    Cancelled appointments are simply marked dead, and discarded when they
+    reach the top of the heap (or when dead entries outnumber live ones).
+    Appointments for the same time are still called in the order they were
+    made."""
+
+    compactThreshold = 64   # don't bother compacting heaps smaller than this
+
+    def __init__(self, time = time.time, wallTime = time.time):
+        super(HeapScheduler,self).__init__(time, wallTime)
+        self._nextSeq = count().next
+        self._live = 0
+        self._dead = 0
+
+    def time_available(self):
+        appts = self._appointments
+        while appts and appts[0][2] is None:
+            heappop(appts); self._dead -= 1
+        if appts:
+            return max(0, appts[0][0] - self.now())
+
+    def tick(self,stop=None):
+        now = self.now()
+        stats = self.stats
+        appts = self._appointments
+        while appts and appts[0][0] <= now and not stop:
+            item = heappop(appts)
+            what = item[2]
+            if what is None:
+                self._dead -= 1
+                continue
+            item[2] = None  # so a late cancel is a no-op
+            self._live -= 1
+            if stats is None:
+                what(self,now)
+            else:
+                stats.callAppointment(self,what,item[0],now)
+        self.isEmpty.set(not self._live)
+
+    def _callAt(self, what, when):
+        self.isEmpty.set(False)
+        item = [when, self._nextSeq(), what]
+        heappush(self._appointments, item)
+        self._live += 1
+
+        def cancel():
+            if item[2] is not None:
+                item[2] = None
+                self._live -= 1
+                self._dead += 1
+                if self._dead>self._live and self._dead>self.compactThreshold:
+                    self._compact()
+
+        return cancel
+
+    def _compact(self):
+        """Drop cancelled appointments and restore the heap invariant"""
+        appts = self._appointments
+        appts[:] = [item for item in appts if item[2] is not None]
+        heapify(appts)
+        self._dead = 0
+
 class _Sleeper(object):
 
     protocols.advise(
@@ -6,7 +6,8 @@ __all__ = [
     'IWritableSource', 'IValue', 'IConditional', 'ISemaphore', 'ITask',
     'IScheduledTask', 'ITaskState', 'IScheduler', 'ISignalSource',
     'ISelector', 'IEventLoop', 'Interruption', 'TimeoutError', 'IWritableValue',
-    'IPausableSource',
+    'IPausableSource', 'IThreadPool', 'IWorkQueue', 'IWorkerPool',
+    'QueueFull',
 ]
 
 
@@ -18,6 +19,10 @@ class TimeoutError(Interruption):
     """A timeout occurred"""
 
 
+class QueueFull(Exception):
+    """An item was added to an 'IWorkQueue' that was already at its limit"""
+
+
 class IProcedure(protocols.Interface):
 
     """Iterator suitable for use in a task, such as a generator-iterator"""
@@ -460,7 +465,15 @@ class IScheduler(protocols.Interface):
         """Run 'iterator', interrupting w/'errorType' after 'timeout' secs"""
 
     def now():
-        """Return the current time"""
+        """Return the current time
+
+        This is the time base used by 'until()' and 'time_available()', and
+        for all timeouts and sleeps.  It may come from a monotonic clock (see
+        'peak.util.monotonic'), in which case it has no relation to calendar
+        time; use 'wallTime()' to find out what time of day it is."""
+
+    def wallTime():
+        """Return the current wall-clock time, as per 'time.time()'"""
 
     def tick(stop=None):
         """Invoke scheduled callbacks whose time has arrived, until 'stop'
@@ -613,3 +626,95 @@ class IEventLoop(IScheduler, ISelector):
         are tasks waiting for I/O, when there are tasks that reschedule
         themselves at short intervals, or when using Twisted."""
 
+
+class IThreadPool(protocols.Interface):
+
+    """Run blocking calls in worker threads, without blocking the event loop
+
+    Usage::
+
+        pool = binding.Obtain(events.IThreadPool)
+
+        def aTask(self):
+            yield self.pool.call(socket.gethostbyname, hostname)
+            address = events.resume()
+
+    There is one pool per service area by default; its size is set by the
+    'peak.events.threadPool.maxThreads' property."""
+
+    def call(func, *args, **kw):
+        """'IEventSource' for the result of 'func(*args,**kw)' in a thread
+
+        The call is queued to run in one of the pool's worker threads.  When
+        it completes, the returned event source fires in the event loop's
+        thread, with the return value as its event.  If the call raised an
+        exception instead, a task that yields the event source has the
+        exception re-raised by its 'events.resume()'.  Once the call has
+        completed, yielding the event source again just returns the same
+        result (or raises the same exception) immediately."""
+
+
+
+
+class IWorkQueue(IEventSource):
+
+    """Bounded FIFO queue of work items, with backpressure
+
+    Like a semaphore, a work queue fires its callbacks (or resumes a waiting
+    task) only while it has items, and each event goes to at most one
+    accepting callback.  A consumer must 'get()' an item after resuming.
+    Producers should wait on 'accepting' before adding items, so that the
+    queue doesn't reach its hard limit."""
+
+    accepting = protocols.Attribute(
+        """'IConditional' that's false between the high and low watermarks
+
+        'accepting' becomes false when the queue's length reaches its high
+        watermark, and stays false until the length falls back to its low
+        watermark."""
+    )
+
+    putCount = protocols.Attribute("Number of items ever added")
+    getCount = protocols.Attribute("Number of items ever removed")
+
+    def put(item):
+        """Add 'item' to the end of the queue
+
+        Raises 'events.QueueFull' if the queue is already at its maximum size.
+        """
+
+    def get():
+        """Remove and return the oldest item; 'IndexError' if empty"""
+
+    def __len__():
+        """Number of items currently in the queue"""
+
+
+class IWorkerPool(protocols.Interface):
+
+    """Process items from an 'IWorkQueue' in up to 'n' concurrent tasks
+
+    Usage::
+
+        pool = events.WorkerPool(self, handler=self.processItem)
+        pool.put(item)
+
+    Each item is passed to the pool's handler.  If the handler returns a
+    generator, it's run as a task, and the pool doesn't start another item in
+    its place until the generator finishes.  Errors are logged and counted,
+    and don't stop the pool."""
+
+    queue = protocols.Attribute("The 'IWorkQueue' the pool takes items from")
+    maxWorkers = protocols.Attribute("Maximum number of concurrent workers")
+    active = protocols.Attribute("Number of items currently being processed")
+    completed = protocols.Attribute("Number of items processed successfully")
+    failed = protocols.Attribute("Number of items whose handler raised")
+
+    def put(item):
+        """Add 'item' to the pool's queue (shortcut for 'queue.put(item)')"""
+
+    def throughput():
+        """Items finished per second since the counters were last reset"""
+
+    def resetCounters():
+        """Zero the 'completed' and 'failed' counts and the throughput timer"""
@@ -6,6 +6,7 @@ import sources
 from event_threads import resume, taskFactory
 from errno import EINTR
 from time import sleep
+from math import ceil
 
 try:
     import signal
@@ -53,7 +54,7 @@ class AbstractIOEvent(sources.Broadcaster):
         super(AbstractIOEvent,self).__init__(*__args,**__kw)
 
     def _register(self):
-        if self._callbacks:
+        if self._live:
             if not self._registered:
                 self._activate()
                 self._registered = True
@@ -102,9 +103,21 @@ class SignalEvent(AbstractIOEvent):
 
 class StreamEvent(AbstractIOEvent):
 
-    """Event used for read/write/exception conditions on streams"""
+    """Event used for read/write/exception conditions on streams
 
-    __slots__ = '_activate','_deactivate'
+    If 'stats' (a 'loop_stats.LoopStats') is supplied, each callback's
+    running time is recorded there, as belonging to that callback."""
+
+    __slots__ = '_activate','_deactivate','_stats'
+
+    def __init__(self,stats=None):
+        super(StreamEvent,self).__init__()
+        self._stats = stats
+
+    def addCallback(self,func):
+        if self._stats is not None:
+            func = self._stats.timed(func)
+        return super(StreamEvent,self).addCallback(func)
 
 
 
@@ -172,13 +185,14 @@ class EventLoop(binding.Component):
     haveSignal = signals = binding.Delegate('sigsrc')
 
     scheduler = binding.Obtain(IScheduler)
-    spawn = now = tick = sleep = until = timeout = time_available \
+    spawn = now = wallTime = tick = sleep = until = timeout = time_available \
         = binding.Delegate('scheduler')
 
     selector  = binding.Obtain(ISelector)
     readable = writable = exceptional = binding.Delegate('selector')
 
     log = binding.Obtain('logger:peak.events.loop')
+    stats = binding.Obtain(PropertyName('peak.events.stats'))
 
 
 
@@ -214,6 +228,11 @@ class EventLoop(binding.Component):
             lambda s,e: [running.pop(),exit.append(e)]
         )
 
+        stats = self.stats
+        if stats is not None:
+            stats.instrument(self.scheduler)
+            tick = stats.timeTick(tick)
+
         if suppressErrors:
             def tick(exit,doTick=tick):
                 try:
@@ -266,6 +285,7 @@ class Selector(binding.Component):
     sleep   = binding.Obtain('import:time.sleep')
     select  = binding.Obtain('import:select.select')
     _error  = binding.Obtain('import:select.error')
+    stats   = binding.Obtain(PropertyName('peak.events.stats'))
 
 
     def readable(self,stream):
@@ -310,6 +330,9 @@ class Selector(binding.Component):
                 else:
                     raise
 
+            if self.stats is not None:
+                self.stats.selected(len(fr)+len(fw)+len(fe))
+
             for fired,events in (fe,e),(fr,r),(fw,w):
                 for stream in fired:
                     events[stream].send(True)
@@ -339,7 +362,7 @@ class Selector(binding.Component):
             return e
 
     def _mkEvent(self,rwe,key):
-        ob = StreamEvent()
+        ob = StreamEvent(self.stats)
         ob._activate = lambda: self._activate(rwe,key,ob)
         ob._deactivate = lambda: self._deactivate(rwe,key)
         return ob
@@ -367,3 +390,174 @@ class Selector(binding.Component):
 
 
 
+
+
+
+
+
+
+
+
+
+
+class _PollAdapter(object):
+
+    """Make a 'select.poll()' object look like a 'select.epoll()' object"""
+
+    __slots__ = 'poller', 'register', 'modify', 'unregister'
+
+    def __init__(self):
+        from select import poll
+        self.poller = poll()
+        self.register = self.modify = self.poller.register
+        self.unregister = self.poller.unregister
+
+    def poll(self,timeout):
+        if timeout is not None:
+            timeout = int(ceil(timeout*1000))   # poll() uses milliseconds
+        return self.poller.poll(timeout)
+
+
+def makePoller():
+
+    """Return '(poller,masks)' for the best available polling mechanism
+
+    'poller' has the 'register()', 'modify()', 'unregister()' and 'poll()'
+    methods of a 'select.epoll' object.  'masks' is a tuple of the bits
+    to register for reading, writing, and exceptional conditions, followed by
+    the bits that indicate errors and hangups."""
+
+    import select
+
+    if hasattr(select,'epoll'):
+        s = select
+        return select.epoll(), (
+            s.EPOLLIN, s.EPOLLOUT, s.EPOLLPRI, s.EPOLLERR, s.EPOLLHUP
+        )
+
+    elif hasattr(select,'poll'):
+        s = select
+        return _PollAdapter(), (
+            s.POLLIN, s.POLLOUT, s.POLLPRI, s.POLLERR|s.POLLNVAL, s.POLLHUP
+        )
+
+    raise NotImplementedError("Neither epoll() nor poll() is available")
+
+
+
+
+
+
+
+class PollSelector(Selector):
+
+    """'ISelector' based on 'select.epoll()', or 'select.poll()' if necessary
+
+    Unlike 'Selector', this doesn't rebuild descriptor lists for every pass
+    through the loop, and it isn't limited to 'FD_SETSIZE' descriptors.
+    Instead, a descriptor is registered with the poller when an event source
+    for it gets its first callback, and unregistered when the source goes
+    idle again."""
+
+    _poller = binding.Make(makePoller)
+    poller  = binding.Make(lambda self: self._poller[0])
+    masks   = binding.Make(lambda self: self._poller[1])
+    registered = binding.Make(dict)     # fd -> currently registered bits
+
+    _errors = binding.Make(
+        lambda self: (self._error, IOError, OSError)
+    )
+
+    def monitor(self):
+
+        count = self.count
+        sleep = self.scheduler.sleep()
+        time_available = self.scheduler.time_available
+        poll = self.poller.poll
+        errors = self._errors
+
+        r,w,e = self.rwe
+        rbit, wbit, ebit, errbits, hupbits = self.masks
+        fires = (e, ebit|errbits), (r, rbit|errbits|hupbits), (w, wbit|errbits)
+
+        while True:
+            yield count; resume()   # wait until there are selectables
+            yield sleep; resume()   # ensure we are in top-level loop
+
+            delay = time_available()
+            if delay is None:
+                delay = self.checkInterval
+
+            try:
+                ready = poll(delay)
+            except errors, v:
+                if v.args and v.args[0]==EINTR:
+                    continue    # signal received during poll, try again
+                else:
+                    raise
+
+            if self.stats is not None:
+                self.stats.selected(len(ready))
+
+            for events, bits in fires:
+                for fd, flags in ready:
+                    if flags & bits and fd in events:
+                        events[fd].send(True)
+
+    monitor = binding.Make(taskFactory(monitor), uponAssembly=True)
+
+
+    def _activate(self,rwe,key,src):
+        super(PollSelector,self)._activate(rwe,key,src)
+        self._update(key)
+
+    def _deactivate(self,rwe,key):
+        super(PollSelector,self)._deactivate(rwe,key)
+        self._update(key)
+
+
+
+
+
+
+
+
+
+
+
+
+    def _update(self,key):
+
+        """Bring the poller's registration for 'key' up to date"""
+
+        bits = 0
+        for events, bit in zip(self.rwe, self.masks):
+            if key in events:
+                bits |= bit
+
+        registered = self.registered
+        old = registered.get(key, 0)
+
+        if bits==old:
+            return
+
+        poller = self.poller
+
+        if not bits:
+            del registered[key]
+            try:
+                poller.unregister(key)
+            except (IOError, OSError, KeyError, ValueError):
+                pass    # descriptor was already closed
+            return
+
+        registered[key] = bits
+
+        if old:
+            try:
+                poller.modify(key, bits)
+                return
+            except (IOError, OSError):
+                pass    # descriptor was closed and reopened; register anew
+
+        poller.register(key, bits)
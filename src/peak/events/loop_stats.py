@@ -0,0 +1,336 @@
+"""Event loop instrumentation: tick, timer, select and callback statistics
+
+To record statistics for the event loops in a service area, make
+'peak.events.stats' a named service, e.g.::
+
+    [Named Services]
+    peak.events.stats = importString('peak.events.loop_stats:LoopStats')()
+
+The 'EventLoop', 'Scheduler' and 'Selector' of the service area will then
+record tick durations, timer lateness, ready descriptors per select, and
+callback durations (including the slowest callbacks, and the component or
+task each belongs to) in the 'LoopStats' instance.  Callbacks run for ready
+descriptors are timed individually, so a slow reader or writer task is
+reported by name; time spent in them isn't counted against the selector's
+own monitoring task.  Its 'report()' method
+returns the collected data as text, and its 'dump()' method writes it to the
+'logger:peak.events.stats' logger.  Listing signal names in the
+'peak.events.stats.dumpOnSignals' property will also dump the statistics
+whenever one of those signals is received.
+"""
+
+from __future__ import generators
+from peak.core import binding, adapt, PropertyName
+from interfaces import ISignalSource
+from sources import subscribe
+from event_threads import Task
+from bisect import bisect_left
+from heapq import heappush, heapreplace
+
+__all__ = [
+    'Histogram', 'LoopStats', 'describeCallback', 'DURATIONS', 'COUNTS',
+]
+
+DURATIONS = (
+    .0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 10, 60
+)
+
+COUNTS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+
+
+
+
+
+
+
+
+
+class Histogram(object):
+
+    """Fixed-size histogram of numeric samples
+
+    Each bucket counts the samples that are less than or equal to its upper
+    bound (and greater than the previous bucket's bound).  A final, unbounded
+    bucket counts samples above the largest bound.  The number, total, minimum
+    and maximum of the samples are also kept.  Memory use is fixed no matter
+    how many samples are added."""
+
+    __slots__ = 'bounds', 'buckets', 'count', 'total', 'min', 'max'
+
+    def __init__(self, bounds=DURATIONS):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self.buckets = [0] * (len(self.bounds)+1)
+        self.count = 0
+        self.total = 0
+        self.min = self.max = None
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value<self.min:
+            self.min = value
+        if self.max is None or value>self.max:
+            self.max = value
+
+    def mean(self):
+        if self.count:
+            return self.total / float(self.count)
+
+    def items(self):
+        """Return a list of '(upperBound,count)' pairs, omitting empty buckets
+
+        The upper bound of the last bucket is 'None'."""
+        return [
+            (bound,count)
+                for bound,count in zip(self.bounds+(None,), self.buckets)
+                    if count
+        ]
+
+    def __str__(self):
+        if not self.count:
+            return "no samples"
+        return "n=%d min=%g mean=%g max=%g  %s" % (
+            self.count, self.min, self.mean(), self.max,
+            ' '.join([
+                (bound is None and ">%g:%d" % (self.bounds[-1],count))
+                    or "<=%g:%d" % (bound,count)
+                        for bound,count in self.items()
+            ])
+        )
+
+
+
+
+
+
+
+
+
+
+def describeCallback(func):
+
+    """Return a string identifying 'func' and whatever component/task it serves
+
+    Bound methods are described by the component path of the object they're
+    bound to (or its type, if it isn't a component), and the method name.
+    Callbacks belonging to an 'events.Task' (including closures that refer to
+    one) are described by the generator the task is running."""
+
+    name = getattr(func, '__name__', None) or type(func).__name__
+    target = getattr(func, 'im_self', None)
+
+    if target is None:
+        for cell in getattr(func, 'func_closure', None) or ():
+            ob = getattr(cell, 'cell_contents', None)
+            if isinstance(ob, Task):
+                target = ob
+                break
+
+    if isinstance(target, Task):
+        return _describeTask(target)
+
+    if target is not None:
+        return "%s.%s" % (_describeObject(target), name)
+
+    code = getattr(func, 'func_code', None)
+    if code is not None:
+        return "%s (%s:%d)" % (name, code.co_filename, code.co_firstlineno)
+
+    return repr(func)
+
+
+def _describeObject(ob):
+    if adapt(ob, binding.IComponent, None) is not None:
+        return str(binding.getComponentPath(ob))
+    return type(ob).__name__
+
+
+def _describeTask(task):
+    stack = task._state.stack
+    frame = stack and getattr(stack[0], 'gi_frame', None)
+    if not frame:
+        return "<finished %s>" % type(task).__name__
+
+    code = frame.f_code
+    owner = frame.f_locals.get('self')
+    if owner is not None:
+        return "%s.%s (task)" % (_describeObject(owner), code.co_name)
+    return "%s (task at %s:%d)" % (
+        code.co_name, code.co_filename, code.co_firstlineno
+    )
+
+
+
+
+
+
+
+
+class LoopStats(binding.Component):
+
+    """Bounded statistics about an event loop's ticks, timers and callbacks"""
+
+    log = binding.Obtain('logger:peak.events.stats')
+    sigsrc = binding.Obtain(ISignalSource)
+    timer = binding.Obtain(PropertyName('peak.running.timers.elapsed'))
+
+    keepSlowest = binding.Obtain(
+        PropertyName('peak.events.stats.keepSlowest')
+    )
+    dumpOnSignals = binding.Obtain(
+        PropertyName('peak.events.stats.dumpOnSignals')
+    )
+
+    ticks     = binding.Make(lambda: Histogram(DURATIONS))
+    lateness  = binding.Make(lambda: Histogram(DURATIONS))
+    callbacks = binding.Make(lambda: Histogram(DURATIONS))
+    readyFDs  = binding.Make(lambda: Histogram(COUNTS))
+
+    slowest = binding.Make(list)    # heap of '(duration, description)'
+
+    _nested = None  # '[secs]' spent in callbacks nested in the current one
+
+
+    def _watchSignals(self):
+        if self.dumpOnSignals:
+            return subscribe(
+                self.sigsrc.signals(*self.dumpOnSignals), self._dumpOnSignal
+            )
+
+    _watchSignals = binding.Make(_watchSignals, uponAssembly=True)
+
+
+    def _dumpOnSignal(self, source, event):
+        self.dump()
+
+
+    def instrument(self, scheduler):
+        """Make 'scheduler' record timer and callback statistics here"""
+        scheduler.stats = self
+
+
+    def timeTick(self, tick):
+        """Return a version of 'tick(stop)' that records tick durations"""
+
+        timer = self.timer
+        ticks = self.ticks
+
+        def timedTick(stop=None):
+            start = timer()
+            try:
+                tick(stop)
+            finally:
+                ticks.add(timer()-start)
+
+        return timedTick
+
+
+    def callAppointment(self, scheduler, what, when, now):
+        """Call scheduler appointment 'what(scheduler,now)', due at 'when'"""
+
+        self.lateness.add(max(0, now-when))
+        self._callTimed(what, (scheduler, now))
+
+
+    def timed(self, func):
+
+        """Return a version of event callback 'func' that records its time
+
+        'func' is described right away, since (e.g.) a task may be finished
+        by the time the callback returns."""
+
+        description = describeCallback(func)
+
+        def timedCallback(source, event):
+            return self._callTimed(func, (source, event), description)
+
+        return timedCallback
+
+
+    def _callTimed(self, func, args, description=None):
+
+        """Call 'func(*args)' and record its time, less nested callbacks'"""
+
+        timer = self.timer
+        outer = self._nested
+        self._nested = nested = [0]
+        start = timer()
+
+        try:
+            return func(*args)
+
+        finally:
+            elapsed = timer()-start
+            self._nested = outer
+            if outer is not None:
+                outer[0] += elapsed
+            self.timedCallback(func, elapsed-nested[0], description)
+
+
+    def timedCallback(self, func, duration, description=None):
+
+        """Record that 'func' took 'duration' seconds to run
+
+        'description' defaults to 'describeCallback(func)', which is only
+        called if the callback is one of the slowest."""
+
+        self.callbacks.add(duration)
+        slowest = self.slowest
+
+        if len(slowest)<self.keepSlowest:
+            push = heappush
+        elif slowest and duration>slowest[0][0]:
+            push = heapreplace
+        else:
+            return
+
+        if description is None:
+            description = describeCallback(func)
+
+        push(slowest, (duration, description))
+
+
+    def selected(self, count):
+        """Record that 'count' descriptors were ready after a select/poll"""
+        self.readyFDs.add(count)
+
+
+    def reset(self):
+        """Discard all collected statistics"""
+        for hist in self.ticks, self.lateness, self.callbacks, self.readyFDs:
+            hist.reset()
+        del self.slowest[:]
+
+
+    def report(self):
+        """Return a list of lines describing the collected statistics"""
+
+        lines = [
+            "tick duration:     %s" % self.ticks,
+            "timer lateness:    %s" % self.lateness,
+            "callback duration: %s" % self.callbacks,
+            "ready descriptors: %s" % self.readyFDs,
+        ]
+
+        slowest = self.slowest[:]
+        slowest.sort()
+        slowest.reverse()
+
+        if slowest:
+            lines.append("slowest callbacks:")
+            for duration, description in slowest:
+                lines.append("  %10.6f  %s" % (duration, description))
+
+        return lines
+
+
+    def dump(self):
+        """Write 'report()' to the 'logger:peak.events.stats' log"""
+        for line in self.report():
+            self.log.info(line)
@@ -230,8 +230,11 @@ class AnyOf(object):
                 while cancels: cancels.pop()()
                 return func(self, (source,event))
 
+        def cancel():
+            while cancels: cancels.pop()()
+
         cancels = [source.addCallback(onceOnly) for source in self._sources]
-        return lambda: [(c(),cancels.remove(c)) for c in cancels]
+        return cancel
 
 
 
@@ -254,7 +257,10 @@ class Observable(object):
     reject the event.
     """
 
-    __slots__ = '_callbacks', '__weakref__', '_disabled', '_savedEvents'
+    __slots__ = (
+        '_callbacks', '_head', '_live', '__weakref__', '_disabled',
+        '_savedEvents', '_firing'
+    )
 
     singleFire = True
     overrunOK  = True
@@ -262,8 +268,9 @@ class Observable(object):
     protocols.advise( instancesProvide=[IEventSource] )
 
     def __init__(self):
-        self._callbacks = []
-        self._disabled = 0
+        self._callbacks = []    # list of '[func]' cells; '[None]' when done
+        self._head = self._live = 0
+        self._disabled = self._firing = 0
 
 
     def nextAction(self, task=None, state=None):
@@ -274,8 +281,27 @@ class Observable(object):
 
     def addCallback(self,func):
         """See 'events.IEventSource.addCallback()'"""
-        cb = self._callbacks; item=(func,object()); cb.append(item)
-        return lambda: (item in cb) and cb.remove(item)
+        item = [func]
+        self._callbacks.append(item)
+        self._live += 1
+        return lambda: self._cancel(item)
+
+
+    def _cancel(self,item):
+
+        if item[0] is None:
+            return  # already called or cancelled
+
+        item[0] = None
+        self._live -= 1
+
+        # Cancelled cells are skipped by '_fire()', but if they outnumber the
+        # live ones, squeeze them out so the list doesn't grow without bound
+        # (but not during a '_fire()', which relies on cells staying put)
+        callbacks, head = self._callbacks, self._head
+        if not self._firing and len(callbacks)-head > 2*self._live+8:
+            callbacks[:] = [cell for cell in callbacks[head:] if cell[0]]
+            self._head = 0
 
 
     def disable(self):
@@ -307,22 +333,40 @@ class Observable(object):
             self._buffer(event)
             return
 
-        callbacks = self._callbacks
-        count = len(callbacks)
+        # Callbacks are consumed by advancing '_head', rather than popping
+        # from the front of the list.  A nested '_fire()' (e.g. a callback
+        # that sets a value) continues from the same position, so each
+        # callback is still called at most once, with the newest event.
+        # Only callbacks added before the '_fire()' began are called; the
+        # list isn't compacted until the outermost '_fire()' is done, so
+        # 'end' stays valid.
 
-        if self.singleFire:
-            while count and callbacks:
-                if callbacks.pop(0)[0](self,event):
+        callbacks = self._callbacks
+        end = len(callbacks)
+        singleFire = self.singleFire
+        self._firing += 1
+
+        try:
+            while self._head<end:
+                cell = callbacks[self._head]
+                self._head += 1
+                func = cell[0]
+                if func is None:
+                    continue    # cancelled
+                cell[0] = None
+                self._live -= 1
+                if func(self,event) and singleFire:
                     return
-                count -= 1
-        else:
-            while count and callbacks:
-                callbacks.pop(0)[0](self,event)
-                count -= 1
-
-
-
-
+        finally:
+            self._firing -= 1
+            if not self._firing:
+                head = self._head
+                if head>=len(callbacks):
+                    del callbacks[:]
+                    self._head = 0
+                elif head>32 and head*2>len(callbacks):
+                    del callbacks[:head]
+                    self._head = 0
 
 
 
@@ -334,7 +378,7 @@ class Observable(object):
             if saved:
                 del saved[0]
 
-        elif len(saved)>=len(self._callbacks):
+        elif len(saved)>=self._live:
             raise ValueError("Can't buffer event", self, event)
 
         saved.append(event)
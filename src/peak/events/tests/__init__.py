@@ -17,7 +17,16 @@ else:
         'test_twisted:test_suite',
     ])
 
+for name in 'asyncio', 'trollius':
+    try:
+        __import__(name)
+    except ImportError:
+        continue
+    allSuites.extend([
+        'test_asyncio:test_suite',
+    ])
+    break
+
 def test_suite():
     from peak.util.imports import importSuite
     return importSuite(allSuites, globals())
-
@@ -0,0 +1,82 @@
+"""Micro-benchmarks for event source callback dispatch
+
+This is not part of the test suite; run it directly to print the number of
+callbacks per second delivered by some common event sources::
+
+    python -m peak.events.tests.bench_sources [callbacks]
+
+Each benchmark registers 'callbacks' listeners (1000 by default) and then
+fires the source, so that both registration and fan-out are measured.
+"""
+
+from peak.api import events
+from time import time
+import sys
+
+
+def sink(source,event):
+    pass
+
+def accept(source,event):
+    return True
+
+
+def benchValue(n):
+    v = events.Value(0)
+    for i in xrange(n):
+        v.addCallback(sink)
+    v.set(1)
+
+
+def benchCancelledValue(n):
+    v = events.Value(0)
+    cancels = [v.addCallback(sink) for i in xrange(n)]
+    for cancel in cancels[::2]:
+        cancel()
+    v.set(1)
+
+
+def benchSemaphore(n):
+    s = events.Semaphore(0)
+    for i in xrange(n):
+        s.addCallback(accept)
+    for i in xrange(n):
+        s.put()
+
+
+def benchAnyOf(n):
+    v1, v2 = events.Value(0), events.Value(0)
+    a = events.AnyOf(v1, v2)
+    for i in xrange(n):
+        a.addCallback(sink)
+    v1.set(1)
+
+
+def timeit(func, n, minTime=1.0):
+    """Return callbacks/second for 'func(n)', repeated for 'minTime' secs"""
+    calls = 0
+    start = time()
+    while True:
+        func(n)
+        calls += n
+        elapsed = time()-start
+        if elapsed>=minTime:
+            return calls/elapsed
+
+
+def main(argv=sys.argv):
+    n = 1000
+    if len(argv)>1:
+        n = int(argv[1])
+    for name, func in [
+        ("Value.set", benchValue),
+        ("Value.set (half cancelled)", benchCancelledValue),
+        ("Semaphore.put", benchSemaphore),
+        ("AnyOf", benchAnyOf),
+    ]:
+        print "%-28s %12.0f callbacks/sec" % (name, timeit(func,n))
+
+
+if __name__=='__main__':
+    main()
+
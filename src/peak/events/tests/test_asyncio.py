@@ -0,0 +1,95 @@
+"""Test event sources and tasks with asyncio"""
+
+from __future__ import generators
+from unittest import TestCase, makeSuite, TestSuite
+from peak.api import *
+from peak.tests import testRoot
+from peak.events.asyncio_support import asyncio, Scheduler, Selector, \
+    EventLoop, toFuture, coroutineTask
+import os, sys
+
+
+class AsyncioLoopTests(TestCase):
+
+    def setUp(self):
+        self.aloop = loop = asyncio.new_event_loop()
+        self.sched = Scheduler(testRoot(), loop=loop)
+        self.selector = Selector(testRoot(), loop=loop)
+        self.eventLoop = EventLoop(testRoot(),
+            loop=loop, scheduler=self.sched, selector=self.selector
+        )
+        self.log = []
+
+    def tearDown(self):
+        self.aloop.close()
+
+    def wait(self, future):
+        try:
+            yield future; self.log.append(events.resume())
+        except:
+            self.log.append(sys.exc_info()[0])
+
+    wait = events.taskFactory(wait)
+
+    def testRunUntil(self):
+        self.assertEqual(
+            self.eventLoop.runUntil(self.sched.timeout(.01)), True
+        )
+
+    def testUncaughtError(self):
+        def fail():
+            raise ValueError
+        self.aloop.call_soon(fail)
+        self.assertRaises(ValueError,
+            self.eventLoop.runUntil, self.sched.timeout(.01)
+        )
+
+    def testFutureResult(self):
+        future = asyncio.Future(loop=self.aloop)
+        task = self.wait(future)
+        self.aloop.call_soon(future.set_result, 42)
+        self.eventLoop.runUntil(task.isFinished)
+        self.assertEqual(self.log, [42])
+        self.wait(future)    # already done
+        self.assertEqual(self.log, [42, 42])
+
+    def testFutureError(self):
+        future = asyncio.Future(loop=self.aloop)
+        task = self.wait(future)
+        self.aloop.call_soon(future.set_exception, ValueError())
+        self.eventLoop.runUntil(task.isFinished)
+        self.assertEqual(self.log, [ValueError])
+
+    def testToFuture(self):
+        value = events.Value()
+        future = toFuture(value, self.aloop)
+        self.aloop.call_soon(value.set, 99)
+        self.assertEqual(self.aloop.run_until_complete(future), 99)
+
+    def testCoroutineTask(self):
+        future = asyncio.Future(loop=self.aloop)
+        task = coroutineTask(future, self.aloop)
+        self.aloop.call_soon(future.set_result, 'done')
+        self.assertEqual(self.eventLoop.runUntil(task), 'done')
+
+    def testReadable(self):
+        r, w = os.pipe()
+        try:
+            os.write(w, 'x')
+            self.assertEqual(
+                self.eventLoop.runUntil(self.eventLoop.readable(r)), True
+            )
+        finally:
+            os.close(r); os.close(w)
+
+
+TestClasses = (
+    AsyncioLoopTests,
+)
+
+def test_suite():
+    s = []
+    for t in TestClasses:
+        s.append(makeSuite(t,'test'))
+
+    return TestSuite(s)
@@ -3,6 +3,7 @@ from __future__ import generators
 from unittest import TestCase, makeSuite, TestSuite
 from peak.api import *
 from peak.tests import testRoot
+import os
 
 class BasicTests(TestCase,object):
 
@@ -170,6 +171,27 @@ class BasicTests(TestCase,object):
         cancel2 = self.source.addCallback(self.sink)
         self.doPut(1,True)
 
+    def testManyCancels(self):
+        # Cancelled callbacks mustn't pile up, or be called
+        cancels = [self.source.addCallback(self.sink) for i in range(100)]
+        for cancel in cancels[:-1]:
+            cancel()
+        cancels[0]()    # cancelling twice is harmless
+        self.doPut(1,True)
+        self.assertEqual(len(self.log),1)
+
+    def testReAddAfterCancel(self):
+        # Only callbacks registered before an event fires are called for it,
+        # even if the number of live callbacks changes along the way
+        def readd(s,e):
+            cancel2()
+            s.addCallback(self.sink)
+        cancel2 = None
+        self.source.addCallback(readd)
+        cancel2 = self.source.addCallback(self.sink)
+        self.doPut(1,True)
+        self.assertEqual(self.log, [])
+
 
 
 
@@ -800,6 +822,13 @@ class SchedulerTests(TestCase):
         self.sched.tick()   # Clear out the 2 and 3, should now be @5
         self.assertEqual(self.sched.time_available(), 2)    # and delay==2
 
+    def testWallTime(self):
+        from peak.util.monotonic import monotonic
+        import time
+        sched = self.sched.__class__(monotonic)
+        self.failUnless(abs(sched.wallTime()-time.time()) < 1)
+        self.failUnless(sched.now is monotonic)
+
     def testUntil(self):
         self.verifyAppts(self.sched.until)
 
@@ -941,6 +970,249 @@ class SchedulerTests(TestCase):
 
 
 
+class HeapSchedulerTests(SchedulerTests):
+
+    def setUp(self):
+        self.time = events.Value(0)
+        self.sched = events.HeapScheduler(self.time)
+
+    def testCancel(self):
+        log = []
+        cancels = [
+            self.sched._callAt(lambda s,e,i=i: log.append(i), i % 5)
+            for i in range(200)
+        ]
+        for c in cancels[::2]:
+            c(); c()    # cancelling twice is harmless
+        self.time.set(4)
+        self.sched.tick()
+        self.assertEqual(log,
+            [i for t in range(5) for i in range(t,200,5) if i % 2]
+        )
+        self.failUnless(self.sched.isEmpty())
+        self.assertEqual(self.sched.time_available(), None)
+
+    def testCancelOnly(self):
+        cancel = self.sched._callAt(lambda s,e: None, 5)
+        self.assertEqual(self.sched.time_available(), 5)
+        cancel()
+        self.assertEqual(self.sched.time_available(), None)
+        self.sched.tick()
+        self.failUnless(self.sched.isEmpty())
+
+
+class HeapScheduledTasksTest(ScheduledTasksTest):
+
+    def setUp(self):
+        self.scheduler = events.HeapScheduler()
+
+
+class PollSelectorTests(TestCase):
+
+    def setUp(self):
+        from peak.events.io_events import PollSelector
+        self.sched = events.Scheduler()
+        self.selector = PollSelector(testRoot(), scheduler=self.sched)
+        self.selector.monitor   # make sure the monitoring task is running
+        self.r, self.w = os.pipe()
+
+    def tearDown(self):
+        os.close(self.r)
+        os.close(self.w)
+
+    def testReadable(self):
+        log = []
+        self.selector.readable(self.r).addCallback(lambda s,e: log.append(e))
+        self.assertEqual(self.selector.registered.keys(), [self.r])
+        os.write(self.w, 'x')
+        self.sched.tick()
+        self.assertEqual(log, [True])
+        self.assertEqual(self.selector.registered, {})   # idle again
+
+    def testWritableAndCancel(self):
+        log = []
+        cancel = self.selector.readable(self.w).addCallback(
+            lambda s,e: log.append('r')
+        )
+        self.selector.writable(self.w).addCallback(lambda s,e: log.append('w'))
+        cancel()
+        self.assertEqual(self.selector.registered.keys(), [self.w])
+        self.sched.tick()
+        self.assertEqual(log, ['w'])
+        self.assertEqual(self.selector.registered, {})
+
+
+class ThreadPoolTests(TestCase):
+
+    def setUp(self):
+        from peak.events.io_events import Selector
+        from peak.events.thread_pool import ThreadPool
+        self.sched = events.Scheduler()
+        selector = Selector(testRoot(), scheduler=self.sched)
+        selector.monitor
+        self.pool = ThreadPool(testRoot(), selector=selector, maxThreads=2)
+
+    def runUntil(self, condition):
+        for i in range(100):
+            if condition():
+                break
+            self.sched.tick()
+        else:
+            self.fail("Timed out waiting for thread pool")
+
+    def testResults(self):
+        log = []
+
+        def fail():
+            raise ValueError("oops")
+
+        def gen():
+            yield self.pool.call(lambda x,y: x*y, 6, y=7)
+            log.append(events.resume())
+            try:
+                yield self.pool.call(fail); events.resume()
+            except ValueError:
+                log.append('error')
+            call = self.pool.call(len, 'abc')
+            yield call; log.append(events.resume())
+            yield call; log.append(events.resume())    # already finished
+
+        task = events.Task(gen())
+        self.runUntil(task.isFinished)
+        self.assertEqual(log, [42, 'error', 3, 3])
+        self.failIf(self.pool.outstanding())
+
+    def testBounded(self):
+        import time
+        calls = [self.pool.call(time.sleep, .01) for i in range(5)]
+        self.assertEqual(self.pool.threadCount, 2)
+        self.runUntil(lambda: not self.pool.outstanding())
+        self.assertEqual([c() for c in calls], [None]*5)
+
+
+class WorkQueueTests(TestCase):
+
+    def setUp(self):
+        self.queue = events.WorkQueue(4, lowWater=1)
+
+    def testQueue(self):
+        q = self.queue
+        log = []
+        q.addCallback(lambda s,e: log.append((s,e)))
+        q.put('a'); q.put('b')
+        self.assertEqual(log, [(q,1)])
+        self.assertEqual(len(q), 2)
+        self.assertEqual([q.get(), q.get()], ['a','b'])
+        self.assertRaises(IndexError, q.get)
+        self.assertEqual((q.putCount, q.getCount), (2,2))
+
+    def testWatermarks(self):
+        q = self.queue
+        for i in range(3):
+            q.put(i)
+            self.failUnless(q.accepting())
+        q.put(3)
+        self.failIf(q.accepting())
+        self.assertRaises(events.QueueFull, q.put, 4)
+        q.get(); q.get()
+        self.failIf(q.accepting())
+        q.get()
+        self.failUnless(q.accepting())
+
+    def testPool(self):
+        time = events.Value(0)
+        sched = events.Scheduler(time)
+        log = []
+
+        def handler(item):
+            if item=='bad':
+                raise ValueError(item)
+            log.append(('start',item))
+            yield sched.sleep(item); events.resume()
+            log.append(('end',item))
+
+        class ErrorLog:
+            def exception(self, msg, *args):
+                log.append(('error',)+args)
+
+        pool = events.WorkerPool(
+            testRoot(), handler=handler, maxWorkers=2, scheduler=sched,
+            queue=self.queue, log=ErrorLog()
+        )
+        for item in 2, 1, 'bad', 0:
+            pool.put(item)
+
+        self.assertEqual(log, [('start',2), ('start',1)])
+        self.assertEqual((pool.active, len(self.queue)), (2, 2))
+
+        for t in 1, 2:
+            time.set(t)
+            sched.tick()
+
+        self.assertEqual(log,
+            [('start',2), ('start',1), ('end',1), ('error','bad'),
+             ('start',0), ('end',0), ('end',2)]
+        )
+        self.assertEqual((pool.active, pool.completed, pool.failed), (0,3,1))
+        self.assertEqual(pool.throughput(), 1.5)
+
+
+class LoopStatsTests(TestCase):
+
+    def setUp(self):
+        from peak.events.loop_stats import LoopStats
+        self.time = events.Value(0)
+        self.sched = events.Scheduler(self.time)
+        self.stats = LoopStats(testRoot(), timer=self.time, keepSlowest=2)
+        self.stats.instrument(self.sched)
+
+    def testHistogram(self):
+        from peak.events.loop_stats import Histogram
+        h = Histogram((1,10))
+        for v in 0, 1, 2, 10, 11, 50:
+            h.add(v)
+        self.assertEqual(h.items(), [(1,2), (10,2), (None,2)])
+        self.assertEqual((h.count, h.min, h.max, h.mean()), (6, 0, 50, 74/6.0))
+        h.reset()
+        self.assertEqual((h.count, h.items()), (0, []))
+
+    def testTimers(self):
+        def slow(secs):
+            return lambda s,e: self.time.set(self.time()+secs)
+        for due,secs in (1,3), (1,1), (2,2):
+            self.sched._callAt(slow(secs), due)
+
+        self.time.set(2)
+        self.stats.timeTick(self.sched.tick)()
+
+        self.assertEqual(self.stats.lateness.count, 3)
+        self.assertEqual(self.stats.lateness.total, 1+1+0)
+        self.assertEqual(self.stats.callbacks.total, 3+1+2)
+        self.assertEqual(self.stats.ticks.total, 6)
+        self.assertEqual([d for d,desc in self.stats.slowest], [2,3])
+        self.assertEqual(len(self.stats.report()), 7)
+
+    def testStreamCallbacks(self):
+        from peak.events.io_events import StreamEvent
+        readable = StreamEvent(self.stats)
+        readable._activate = readable._deactivate = lambda: None
+
+        time = self.time
+        def slowReader():
+            yield readable; events.resume()
+            time.set(time()+5)
+        events.Task(slowReader())
+
+        # As if the selector's monitor task fired it from an appointment
+        self.sched._callAt(lambda s,e: readable.send(True), 0)
+        self.stats.timeTick(self.sched.tick)()
+
+        duration, description = max(self.stats.slowest)
+        self.assertEqual(duration, 5)
+        self.failUnless(description.startswith('slowReader (task'))
+        self.assertEqual(min(self.stats.slowest)[0], 0)  # not the monitor
+
+
 class BaseSubscriber(object):
     __slots__ = 'log'
 
@@ -1232,9 +1504,21 @@ TestClasses = (
     BasicTests, ValueTests, ConditionTests, SemaphoreTests, AnyOfTests,
     TestTasks, ScheduledTasksTest, SchedulerTests, AdviceTests,
     DerivedValueTests, DerivedConditionTests, BroadcastTests, TaskYielding,
-    SubscriptionTests, LogicTests, NullTests1, NullTests2, SemanticsTests
+    SubscriptionTests, LogicTests, NullTests1, NullTests2, SemanticsTests,
+    HeapSchedulerTests, HeapScheduledTasksTest, LoopStatsTests,
+    WorkQueueTests,
 )
 
+if hasattr(os,'pipe'):
+    try:
+        from peak.events.io_events import makePoller
+        makePoller()
+    except NotImplementedError:
+        pass
+    else:
+        TestClasses += (PollSelectorTests,)
+    TestClasses += (ThreadPoolTests,)
+
 def test_suite():
     s = []
     for t in TestClasses:
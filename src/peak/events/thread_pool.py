@@ -0,0 +1,279 @@
+"""Worker thread pool for running blocking calls from event-driven tasks
+
+'ThreadPool' is the default 'events.IThreadPool' implementation.  Calls are
+queued to a bounded set of worker threads.  When a call completes, the worker
+writes a byte to a "self-pipe" that the pool's 'events.ISelector' is watching,
+so that the event loop's thread wakes up and fires the call's event source.
+Worker threads are started only as needed, up to the service area's
+'peak.events.threadPool.maxThreads' setting.
+
+This module requires 'os.pipe()' and 'fcntl', and so is only usable on
+POSIX platforms.
+"""
+
+from __future__ import generators
+from peak.core import protocols, binding, PropertyName, NOT_GIVEN
+from peak.util.threads import allocate_lock
+from interfaces import *
+import sources
+from event_threads import resume, taskFactory
+from errno import EAGAIN, EINTR
+import os, sys
+
+__all__ = ['ThreadPool', 'ThreadCall']
+
+
+class _Failure(object):
+
+    """Event sent by a 'ThreadCall' whose function raised an exception"""
+
+    __slots__ = 'exc_info'
+
+    def __init__(self,exc_info):
+        self.exc_info = exc_info
+
+    def reraise(self):
+        t,v,tb = self.exc_info
+        raise t,v,tb
+
+
+
+
+
+
+
+
+
+class ThreadCall(sources.Observable):
+
+    """'IEventSource' for the outcome of a call made in a worker thread
+
+    Callbacks receive the call's return value as their event, or a failure
+    object if the call raised an exception.  Tasks that yield a 'ThreadCall'
+    get the return value from 'events.resume()', or have the exception
+    re-raised there."""
+
+    __slots__ = 'func', 'args', 'kw', 'done', 'ok', 'result'
+
+    singleFire = False      # Broadcast the outcome to all callbacks
+    overrunOK  = False
+
+    def __init__(self, func, args=(), kw={}):
+        sources.Observable.__init__(self)
+        self.func = func
+        self.args = args
+        self.kw = kw
+        self.done = False
+
+
+    def run(self):
+        """Make the call (in a worker thread); return '(ok,result)'"""
+        func, args, kw = self.func, self.args, self.kw
+        self.func = self.args = self.kw = None
+        try:
+            return True, func(*args,**kw)
+        except:
+            return False, sys.exc_info()
+
+
+    def finish(self, ok, result):
+        """Record the outcome (in the event loop's thread) and fire it"""
+        self.ok, self.result, self.done = ok, result, True
+        self._fire(self._event())
+
+
+    def __call__(self):
+        """Return the call's result, or 'NOT_GIVEN' if not finished"""
+        if self.done:
+            return self._event()
+        return NOT_GIVEN
+
+
+    def _event(self):
+        if self.ok:
+            return self.result
+        return _Failure(self.result)
+
+
+    def addCallback(self,func):
+        if self.done:
+            func(self, self._event())
+            return lambda: None     # already fired, nothing to cancel
+        return super(ThreadCall,self).addCallback(func)
+
+
+    def nextAction(self, task=None, state=None):
+
+        if state is not None:
+
+            def handler():
+                event = resume()
+                if isinstance(event,_Failure):
+                    event.reraise()
+                yield event
+
+            state.CALL(handler())
+
+            if self.done:
+                state.YIELD(self._event())
+            else:
+                self.addCallback(task.step)
+
+        return self.done
+
+
+
+
+
+
+
+
+
+
+def makePipe():
+
+    """Return '(readfd,writefd)' for a non-blocking pipe"""
+
+    from fcntl import fcntl, F_GETFL, F_SETFL
+    r, w = os.pipe()
+    for fd in r, w:
+        fcntl(fd, F_SETFL, fcntl(fd, F_GETFL) | os.O_NONBLOCK)
+    return r, w
+
+
+class ThreadPool(binding.Component):
+
+    """Bounded pool of worker threads; see 'events.IThreadPool'"""
+
+    protocols.advise( instancesProvide = [IThreadPool] )
+
+    maxThreads = binding.Obtain(
+        PropertyName('peak.events.threadPool.maxThreads')
+    )
+
+    selector = binding.Obtain(ISelector)
+    log = binding.Obtain('logger:peak.events.threads')
+
+    requests    = binding.Make('Queue:Queue')
+    completed   = binding.Make(list)
+    lock        = binding.Make(allocate_lock)
+    pipe        = binding.Make(makePipe)
+    outstanding = binding.Make(lambda: sources.Semaphore(0))
+
+    threadCount = 0
+    idleThreads = 0
+
+
+    def call(self, func, *args, **kw):
+        """See 'events.IThreadPool.call()'"""
+        call = ThreadCall(func, args, kw)
+        self.outstanding.put()
+        self.dispatcher     # make sure we're listening for completions
+        self.requests.put(call)
+        self._checkThreads()
+        return call
+
+
+
+
+
+
+
+
+
+    def _checkThreads(self):
+
+        """Start a worker thread, if calls are waiting and we're not full"""
+
+        lock = self.lock
+        lock.acquire()
+        try:
+            if self.threadCount>=self.maxThreads or \
+                self.requests.qsize()<=self.idleThreads:
+                    return
+            self.threadCount += 1
+        finally:
+            lock.release()
+
+        from threading import Thread
+        t = Thread(
+            target=self._worker,
+            args=(self.requests, self.completed, self.lock, self.pipe[1])
+        )
+        t.setDaemon(True)
+        t.start()
+
+
+    def _worker(self, requests, completed, lock, wakeFD):
+
+        """Worker thread body: run queued calls until the process exits"""
+
+        while True:
+            lock.acquire(); self.idleThreads += 1; lock.release()
+            call = requests.get()
+            lock.acquire(); self.idleThreads -= 1; lock.release()
+
+            outcome = call.run()
+
+            lock.acquire()
+            try:
+                completed.append((call,outcome))
+                wakeup = len(completed)==1
+            finally:
+                lock.release()
+
+            if wakeup:
+                try:
+                    os.write(wakeFD, 'x')
+                except OSError, v:
+                    if v.args[0]!=EAGAIN:   # pipe full means already awake
+                        raise
+
+
+
+
+
+
+
+
+
+    def dispatcher(self):
+
+        readFD = self.pipe[0]
+        readable = self.selector.readable(readFD)
+        outstanding = self.outstanding
+        completed = self.completed
+        lock = self.lock
+
+        while True:
+            yield outstanding; resume()     # wait until calls are pending
+            yield readable; resume()        # wait for a worker to finish
+
+            # Drain the pipe *before* collecting results, so that a result
+            # arriving after we collect will leave a byte in the pipe
+            while True:
+                try:
+                    if not os.read(readFD, 512):
+                        break
+                except OSError, v:
+                    if v.args[0]==EINTR:
+                        continue
+                    elif v.args[0]==EAGAIN:
+                        break
+                    raise
+
+            lock.acquire()
+            try:
+                done = completed[:]
+                del completed[:]
+            finally:
+                lock.release()
+
+            for call, (ok,result) in done:
+                outstanding.take()
+                try:
+                    call.finish(ok,result)
+                except:
+                    self.log.exception("Error in thread call callback:")
+
+    dispatcher = binding.Make(taskFactory(dispatcher))
@@ -68,7 +68,7 @@ class DeferredAsEventSource(sources.Value,protocols.StickyAdapter):
             func(self, self.subject.result)
             return lambda:None  # cancel is no-op
 
-        haveCB = len(self._callbacks)
+        haveCB = self._live
         canceller = super(DeferredAsEventSource,self).addCallback(func)
         if not haveCB:
             self.subject.addCallbacks(self._fire, self._fire)
@@ -127,6 +127,7 @@ class Scheduler(binding.Component,events.Scheduler):
 
     reactor = binding.Obtain(running.ITwistedReactor)
     now     = binding.Obtain('import:time.time')
+    wallTime = binding.Obtain('import:time.time')
     isEmpty = binding.Make(lambda: events.Condition(True))
 
     def time_available(self):
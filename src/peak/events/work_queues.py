@@ -0,0 +1,185 @@
+"""Bounded work queues, and pools of tasks that process them
+
+A 'WorkQueue' is a FIFO event source that tasks can wait on for items to
+arrive, with a hard size limit and a high/low watermark 'accepting'
+condition that producers can wait on for backpressure.  A 'WorkerPool' runs
+a handler over the items of a 'WorkQueue', in up to 'maxWorkers' concurrent
+tasks, and keeps throughput counters.
+"""
+
+from __future__ import generators
+from peak.core import protocols, binding, PropertyName
+from interfaces import *
+from sources import Condition, Semaphore
+from event_threads import resume, taskFactory
+from types import GeneratorType
+
+__all__ = ['WorkQueue', 'WorkerPool']
+
+
+class WorkQueue(object):
+
+    """Bounded FIFO queue of work items; see 'events.IWorkQueue'
+
+    'maxSize' is the hard limit on the queue's length ('None' for no limit).
+    'highWater' defaults to 'maxSize', and 'lowWater' to half of 'highWater'.
+    If there's no high watermark, 'accepting' is always true.
+
+    Yielding a 'WorkQueue' in a task suspends the task until the queue is
+    non-empty; 'events.resume()' then returns the current queue length."""
+
+    __slots__ = (
+        'items', 'available', 'accepting', 'maxSize', 'highWater',
+        'lowWater', 'putCount', 'getCount', '__weakref__',
+    )
+
+    protocols.advise( instancesProvide=[IWorkQueue] )
+
+    def __init__(self, maxSize=None, highWater=None, lowWater=None):
+
+        if highWater is None:
+            highWater = maxSize
+
+        if lowWater is None and highWater is not None:
+            lowWater = highWater // 2
+
+        self.items = []
+        self.available = Semaphore(0)
+        self.accepting = Condition(True)
+        self.maxSize = maxSize
+        self.highWater = highWater
+        self.lowWater = lowWater
+        self.putCount = self.getCount = 0
+
+
+    def __len__(self):
+        return len(self.items)
+
+
+    def put(self,item):
+        """See 'events.IWorkQueue.put()'"""
+
+        items = self.items
+        if self.maxSize is not None and len(items)>=self.maxSize:
+            raise QueueFull("Work queue is full", self, item)
+
+        items.append(item)
+        self.putCount += 1
+
+        if self.highWater is not None and len(items)>=self.highWater:
+            self.accepting.set(False)
+
+        self.available.put()
+
+
+    def get(self):
+        """See 'events.IWorkQueue.get()'"""
+
+        item = self.items.pop(0)
+        self.getCount += 1
+        self.available.take()
+
+        if self.lowWater is not None and len(self.items)<=self.lowWater:
+            self.accepting.set(True)
+
+        return item
+
+
+    def addCallback(self,func):
+        """See 'events.IEventSource.addCallback()'"""
+        return self.available.addCallback(lambda s,e: func(self,e))
+
+
+    def nextAction(self, task=None, state=None):
+        """See 'events.ITaskSwitch.nextAction()'"""
+        return self.available.nextAction(task,state)
+
+
+
+
+
+
+
+
+
+class WorkerPool(binding.Component):
+
+    """Run 'handler(item)' for queued items, in up to 'maxWorkers' tasks
+
+    See 'events.IWorkerPool' for details.  'maxWorkers' defaults to the
+    'peak.events.workerPool.maxWorkers' property, and 'queue' to an unbounded
+    'WorkQueue'; supply a bounded one to get backpressure via its 'accepting'
+    condition."""
+
+    protocols.advise( instancesProvide=[IWorkerPool] )
+
+    handler = binding.Require("Callable to process each work item")
+
+    maxWorkers = binding.Obtain(
+        PropertyName('peak.events.workerPool.maxWorkers')
+    )
+
+    queue     = binding.Make(WorkQueue)
+    scheduler = binding.Obtain(IScheduler)
+    log       = binding.Obtain('logger:peak.events.workers')
+
+    idleWorkers = binding.Make(lambda self: Semaphore(self.maxWorkers))
+    startTime   = binding.Make(lambda self: self.scheduler.now())
+
+    active = completed = failed = 0
+
+
+    def put(self,item):
+        """See 'events.IWorkerPool.put()'"""
+        self.supervisor     # make sure we're running
+        self.queue.put(item)
+
+
+    def throughput(self):
+        """See 'events.IWorkerPool.throughput()'"""
+        elapsed = self.scheduler.now() - self.startTime
+        if elapsed>0:
+            return self.completed / elapsed
+        return 0.0
+
+
+    def resetCounters(self):
+        """See 'events.IWorkerPool.resetCounters()'"""
+        self.completed = self.failed = 0
+        self.startTime = self.scheduler.now()
+
+
+    def supervisor(self):
+
+        queue = self.queue
+        idle = self.idleWorkers
+        self.startTime      # start the throughput clock
+
+        while True:
+            # Wait for a free worker and an item for it to work on
+            yield idle; resume()
+            yield queue; resume()
+
+            idle.take()
+            self.active += 1
+            self._work(queue.get())
+
+    supervisor = binding.Make(taskFactory(supervisor), uponAssembly=True)
+
+
+    def _work(self,item):
+
+        try:
+            result = self.handler(item)
+            if isinstance(result,GeneratorType):
+                yield result; resume()
+        except:
+            self.failed += 1
+            self.log.exception("Error processing work item %r:", item)
+        else:
+            self.completed += 1
+
+        self.active -= 1
+        self.idleWorkers.put()
+
+    _work = taskFactory(_work)
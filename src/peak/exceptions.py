@@ -106,6 +106,10 @@ class TooManyResults(Exception):
 class TooFewResults(Exception):
     """Exactly one row was expected, but no rows were returned."""
 
+
+class PoolTimeout(Exception):
+    """No pooled connection became available in time for a checkout"""
+
 # Running
 
 class StopRunning(Exception):
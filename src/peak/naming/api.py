@@ -10,6 +10,8 @@ from peak.util.imports import lazyModule
 URL = lazyModule(__name__,'../URL')
 del lazyModule
 
+from peak.util import startup_profile as _startup
+
 def InitialContext(parent, componentName=None, **options):
 
     """Get an initial naming context, based on 'parent' and keyword options
@@ -50,7 +52,15 @@ def lookup(parent, name, default=NOT_GIVEN, **options):
         naming.InitialContext(parent,**options)[name]
     """
 
-    return InitialContext(parent, **options).lookup(name,default)
+    profiler = _startup.profiler
+    if profiler is None:
+        return InitialContext(parent, **options).lookup(name,default)
+
+    profiler.begin('naming', str(name))
+    try:
+        return InitialContext(parent, **options).lookup(name,default)
+    finally:
+        profiler.end()
 
 del NOT_GIVEN   # don't pollute the namespace
 
@@ -1,5 +1,10 @@
 """Base classes for Main Programs (i.e. processes invoked from the OS)"""
 from __future__ import generators
+
+# Start profiling (if requested) before importing the rest of PEAK
+from peak.util import startup_profile
+startup_profile.startFromEnviron()
+
 from peak.api import *
 from interfaces import *
 from peak.util.imports import importObject
@@ -721,6 +726,11 @@ class Bootstrap(AbstractInterpreter):
         )]
     )
 
+    [options.option_handler('--profile-startup', value=None,
+        help="Report where startup time is spent, on exit")]
+    def profile_startup(self, parser, optname, optval, remaining_args):
+        startup_profile.start(self.stderr)
+
     decorate(binding.Make)
     def cmdParent(self):
         if self.cmdConfig:
@@ -2,6 +2,7 @@ from __future__ import generators
 from peak.api import *
 from interfaces import *
 from bisect import insort_left
+from math import ceil
 from peak.naming.interfaces import IStreamFactory
 from peak.storage.interfaces import IManagedConnection
 from lockfiles import NullLockFile
@@ -41,6 +42,15 @@ __all__ = [
 
 class TaskQueue(binding.Component):
 
+    """Run prioritized periodic tasks; see 'running.ITaskQueue'
+
+    If 'timerSlack' (the 'peak.running.taskQueue.timerSlack' property, by
+    default) is non-zero, the queue coalesces its timers: each task's next
+    run is delayed to the next multiple of 'timerSlack' seconds, and all tasks
+    due at the same moment share one timer and are run together, without
+    returning to the event loop between them.  A task may override the
+    queue's setting with a 'timerSlack' attribute of its own."""
+
     protocols.advise(
         instancesProvide=[ITaskQueue]
     )
@@ -49,10 +59,15 @@ class TaskQueue(binding.Component):
     loop        = binding.Obtain(IMainLoop)
     ping        = binding.Obtain('loop/activityOccurred')
 
+    timerSlack  = binding.Obtain(
+        PropertyName('peak.running.taskQueue.timerSlack')
+    )
+
     activeTasks = binding.Make(list)
 
     _enabled   = binding.Make(lambda: events.Condition(True))
     _taskCount = binding.Make(lambda: events.Semaphore(0))
+    _wakeups   = binding.Make(dict)     # wakeup time -> list of tasks
 
 
     def addTask(self,ptask):
@@ -68,13 +83,64 @@ class TaskQueue(binding.Component):
         self._enabled.set(False)
 
 
+    def _schedule(self,task):
+
+        """Put 'task' back in the queue after its 'pollInterval' elapses"""
+
+        slack = getattr(task, 'timerSlack', None)
+        if slack is None:
+            slack = self.timerSlack
+
+        if not slack:
+            self.eventLoop.sleep(task.pollInterval).addCallback(
+                lambda src,evt,task=task: self.addTask(task)
+            )
+            return
+
+        # Round the due time up to the next multiple of 'slack', so that
+        # tasks due within the same window wake up together.  ('float()'
+        # keeps integer clocks and intervals from truncating to 'now'.)
+        when = ceil((self.eventLoop.now()+task.pollInterval)/float(slack))
+        when = when * slack
+
+        if when in self._wakeups:
+            self._wakeups[when].append(task)
+        else:
+            self._wakeups[when] = [task]
+            self.eventLoop.until(when).addCallback(
+                lambda src,evt: self._wake(when)
+            )
+
+
+    def _wake(self,when):
+        for task in self._wakeups.pop(when):
+            self.addTask(task)
 
 
+    def _runTask(self):
 
+        """Run the highest-priority task, and reschedule it if needed"""
 
+        didWork = cancelled = False
 
+        try:
 
+            task = self.activeTasks.pop()  # Highest priority task
+            self._taskCount.take()
 
+            try:
+                didWork = task()
+
+            except exceptions.StopRunning:  # Don't reschedule the task
+                cancelled = True
+
+        finally:
+
+            if didWork:
+                self.ping()     # we did something; make note of it
+
+        if not cancelled:
+            self._schedule(task)
 
 
 
@@ -92,29 +158,14 @@ class TaskQueue(binding.Component):
             if not self._enabled():
                 continue    # We were disabled while sleeping, so wait again
 
-            didWork = cancelled = False
-
-            try:
-
-                task = self.activeTasks.pop()  # Highest priority task
-                self._taskCount.take()
-
-                try:
-                    didWork = task()
-
-                except exceptions.StopRunning:  # Don't reschedule the task
-                    cancelled = True
-
-            finally:
-
-                if didWork:
-                    self.ping()     # we did something; make note of it
-
-            if not cancelled:
-                # Schedule item to be put back in the list
-                self.eventLoop.sleep(task.pollInterval).addCallback(
-                    lambda src,evt,task=task: self.addTask(task)
-                )
+            if self.timerSlack:
+                # Run everything that's due now, in one wakeup
+                for i in range(len(self.activeTasks)):
+                    if not self._enabled():
+                        break
+                    self._runTask()
+            else:
+                self._runTask()
 
 
     _processNextTask = binding.Make(
@@ -139,6 +190,8 @@ class AdaptiveTask(binding.Component):
 
     priority = 0
 
+    timerSlack = None   # use the task queue's 'timerSlack'
+
     # Maximum idle defaults to increasing three times
 
     maximumIdle = binding.Make(
@@ -353,8 +406,14 @@ class ManagedConnectionAsCheckableResource(object):
         self.mc = ob
 
     def checkResource(self):
-        self.mc.connection # reference it to ensure it's opened
-        # and just return None (success)
+        mc = self.mc
+        # reference the connection to ensure it's opened, and then ping it
+        # (if it knows how; not all 'IManagedConnection' objects do)
+        conn = mc.connection
+        ping = getattr(mc, '_ping', None)
+        if ping is not None and not ping(conn):
+            return "Connection to %s is not responding" % (mc.address,)
+        # otherwise just return None (success)
 
 
 
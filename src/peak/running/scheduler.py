@@ -7,7 +7,7 @@ from peak.util.EigenData import EigenCell, AlreadyRead
 from errno import EINTR
 
 __all__ = [
-    'MainLoop', 'UntwistedReactor',
+    'MainLoop', 'UntwistedReactor', 'DelayedCall',
 ]
 
 
@@ -120,6 +120,85 @@ class MainLoop(binding.Component):
 
 
 
+
+class DelayedCall(object):
+
+    """Cancellable handle for a call scheduled by 'UntwistedReactor.callLater'
+
+    Offers the subset of Twisted's 'IDelayedCall' that PEAK code needs:
+    'getTime()', 'cancel()', and 'active()'.  The handle is itself the
+    scheduler callback, so scheduling a call doesn't create any closures."""
+
+    __slots__ = 'time', 'func', 'args', 'kw', 'called', '_cancel'
+
+    def __init__(self, time, func, args, kw):
+        self.time = time
+        self.func = func
+        self.args = args
+        self.kw = kw
+        self.called = False
+        self._cancel = None
+
+    def __call__(self, scheduler, now):
+        func, args, kw = self.func, self.args, self.kw
+        if func is not None:
+            self.called = True
+            self.func = self.args = self.kw = self._cancel = None
+            func(*args, **kw)
+
+    def getTime(self):
+        return self.time
+
+    def active(self):
+        return self.func is not None
+
+    def cancel(self):
+        if self.func is None:
+            if self.called:
+                raise ValueError("Call has already been made", self)
+            raise ValueError("Call has already been cancelled", self)
+        cancel = self._cancel
+        self.func = self.args = self.kw = self._cancel = None
+        if cancel is not None:
+            cancel()
+
+
+class _IOWatch(object):
+
+    """Persistent reader/writer registration for an 'UntwistedReactor'
+
+    The watch re-registers itself with its event source each time the source
+    fires, so that the source (and the selector beneath it) stays active
+    until the reader or writer is removed."""
+
+    __slots__ = 'reactor', 'method', '_cancel'
+
+    def __init__(self, reactor, source, method):
+        self.reactor = reactor
+        self.method = method
+        self._cancel = source.addCallback(self)
+
+    def __call__(self, source, event):
+        if self.method is not None:
+            self._cancel = source.addCallback(self)
+            self.reactor._ready(self)
+
+    def stop(self):
+        if self.method is not None:
+            self.method = None
+            self._cancel()
+            self._cancel = self.reactor = None
+
+
+
+
+
+
+
+
+
+
+
 
 class UntwistedReactor(binding.Component):
 
@@ -137,25 +216,28 @@ class UntwistedReactor(binding.Component):
     sleep   = binding.Obtain('import:time.sleep')
 
     eventLoop = binding.Obtain(events.IEventLoop)
+    scheduler = binding.Obtain(events.IScheduler)
+
+    batchIO = binding.Obtain(PropertyName('peak.running.reactor.batchIO'))
+    _pending = binding.Make(list)
 
     def addReader(self, reader):
         if reader not in self.readers:
-            e = self.readers[reader] = self.eventLoop.readable(reader)
-            e.addCallback(lambda s,e: self._fire(self.readers, reader, reader.doRead))
+            self.readers[reader] = _IOWatch(
+                self, self.eventLoop.readable(reader), reader.doRead
+            )
 
     def addWriter(self, writer):
         if writer not in self.writers:
-            e = self.writers[writer] = self.eventLoop.writable(writer)
-            e.addCallback(lambda s,e: self._fire(self.writers, writer, writer.doWrite))
+            self.writers[writer] = _IOWatch(
+                self, self.eventLoop.writable(writer), writer.doWrite
+            )
 
     def removeReader(self, reader):
-        if reader in self.readers: del self.readers[reader]
+        if reader in self.readers: self.readers.pop(reader).stop()
 
     def removeWriter(self, writer):
-        if writer in self.writers: del self.writers[writer]
-
-
-
+        if writer in self.writers: self.writers.pop(writer).stop()
 
 
 
@@ -180,6 +262,8 @@ class UntwistedReactor(binding.Component):
             handler = None  # drop signal handling, if we were using it
 
             # clear selectables (XXX why???)
+            for watch in self.readers.values()+self.writers.values():
+                watch.stop()
             self._delBinding('readers')
             self._delBinding('writers')
 
@@ -190,10 +274,16 @@ class UntwistedReactor(binding.Component):
     def crash(self):
         self.stopped.set(True)
 
+    def seconds(self):
+        """Current time, in the scheduler's time base (see 'callLater()')"""
+        return self.scheduler.now()
+
     def callLater(self, delay, callable, *args, **kw):
-        self.eventLoop.sleep(delay).addCallback(
-            lambda s,e: callable(*args,**kw) or True
-        )
+        """Call 'callable(*args,**kw)' after 'delay'; returns a 'DelayedCall'"""
+        when = self.scheduler.now() + delay
+        call = DelayedCall(when, callable, args, kw)
+        call._cancel = self.scheduler._callAt(call, when)
+        return call
 
 
 
@@ -202,16 +292,41 @@ class UntwistedReactor(binding.Component):
 
 
 
+    def _ready(self, watch):
 
-    def _fire(self, events, target, method):
+        """'watch' has fired; call it now, or batch it for '_dispatch()'"""
 
-        if target in events:
-            # Only fire currently-active events
-            events[target].addCallback(
-                lambda s,e: self._fire(events,target,method)
-            )
-            method()
+        if not self.batchIO:
+            watch.method()
+            return
+
+        pending = self._pending
+        if not pending:
+            self.scheduler._callAt(self._dispatch, self.scheduler.now())
+        pending.append(watch)
+
+
+    def _dispatch(self, scheduler, now):
+
+        """Run all the readers/writers that fired in the last select cycle"""
+
+        batch = self._pending
+        self._pending = []
 
+        for i in range(len(batch)):
+            method = batch[i].method
+            if method is not None:  # skip any that were removed meanwhile
+                try:
+                    method()
+                except:
+                    rest = batch[i+1:]
+                    if rest:
+                        if not self._pending:
+                            self.scheduler._callAt(
+                                self._dispatch, self.scheduler.now()
+                            )
+                        self._pending[:0] = rest
+                    raise
 
     def iterate(self, delay=None):
         """Handle scheduled events for up to 'delay' seconds"""
@@ -326,6 +326,23 @@ class ReactiveTests(TestCase):
 
 
 
+    def checkTimerSlack(self):
+
+        log = self.append
+        app = self.app
+        app.lookupComponent(running.ITaskQueue).timerSlack = 10
+
+        t5 = QuietTask(app, runEvery = 5, job = "ping", log = log)
+        t7 = QuietTask(app, runEvery = 7, job = "pong", log = log)
+
+        app.mainLoop.run(25)
+
+        # Both tasks' timers are rounded up to the same 10-second boundaries
+        self.assertEqual(self.log, [
+            ping, pong, sleep(10), ping, pong, sleep(10), ping, pong, sleep(5)
+        ])
+
+
     def checkAdaptativeScheduling(self):
 
         log = self.append
@@ -406,10 +423,92 @@ class ReactiveTests(TestCase):
 
 
 
+
+
+class FakeIO(object):
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def doRead(self):
+        self.log(('read', self.name))
+
+    def doWrite(self):
+        self.log(('write', self.name))
+
+
+class FakeEventLoop(object):
+
+    def __init__(self):
+        self.sources = {}
+
+    def readable(self, stream):
+        return self.sources.setdefault(('r',stream), events.Broadcaster())
+
+    def writable(self, stream):
+        return self.sources.setdefault(('w',stream), events.Broadcaster())
+
+
+class ReactorTests(TestCase):
+
+    def setUp(self):
+        self.app = TestApp(testRoot())
+        self.log = self.app.log
+        self.loop = FakeEventLoop()
+
+    def checkCallLater(self):
+        app = self.app
+        c1 = app.reactor.callLater(1, self.log.append, 'a')
+        c2 = app.reactor.callLater(2, self.log.append, 'b')
+        self.assertEqual(c2.getTime(), 2)
+        c2.cancel()
+        self.failUnless(c1.active())
+        self.failIf(c2.active())
+        self.assertRaises(ValueError, c2.cancel)
+
+        app.clock.now = 3
+        app.scheduler.tick()
+        self.assertEqual(self.log, ['a'])
+        self.failIf(c1.active())
+        self.failUnless(c1.called)
+        self.assertRaises(ValueError, c1.cancel)
+        self.failUnless(app.scheduler.isEmpty())
+
+    def checkImmediateIO(self):
+        reactor = UntwistedReactor(
+            self.app, eventLoop=self.loop, batchIO=False
+        )
+        r, w = FakeIO('r', self.app.append), FakeIO('w', self.app.append)
+        reactor.addReader(r); reactor.addWriter(w)
+        self.loop.sources['r',r].send(True)
+        self.loop.sources['w',w].send(True)
+        self.assertEqual(self.log, [('read','r'), ('write','w')])
+
+    def checkBatchedIO(self):
+        reactor = UntwistedReactor(self.app, eventLoop=self.loop, batchIO=True)
+        r1, r2 = FakeIO('r1', self.app.append), FakeIO('r2', self.app.append)
+        reactor.addReader(r1); reactor.addReader(r2)
+        src1, src2 = self.loop.sources['r',r1], self.loop.sources['r',r2]
+
+        src1.send(True); src2.send(True)
+        self.assertEqual(self.log, [])     # nothing happens until dispatch
+        self.app.scheduler.tick()
+        self.assertEqual(self.log, [('read','r1'), ('read','r2')])
+
+        # registrations persist, but removed readers aren't dispatched
+        src1.send(True); src2.send(True); reactor.removeReader(r1)
+        self.app.scheduler.tick()
+        self.assertEqual(self.log[2:], [('read','r2')])
+
+        reactor.removeReader(r2)
+        src1.send(True); src2.send(True)
+        self.app.scheduler.tick()
+        self.assertEqual(len(self.log), 3)
 
 
 TestClasses = (
-    ClusterTests, ReactiveTests
+    ClusterTests, ReactiveTests, ReactorTests
 )
 
 def _suite():
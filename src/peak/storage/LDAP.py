@@ -187,6 +187,14 @@ class LDAPConnection(ManagedConnection):
         return conn
 
 
+    def _discard(self, conn):
+        """Unbind a pooled connection that's being thrown away"""
+        try:
+            conn.unbind_s()
+        except:
+            pass
+
+
     def __getattr__(self, attr):
         if not attr.startswith('_'):
             return getattr(self.connection, attr)
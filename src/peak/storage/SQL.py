@@ -3,12 +3,17 @@ from peak.api import *
 from interfaces import *
 from peak.util.Struct import makeStructType
 from peak.util.imports import importObject
+from peak.util.threads import allocate_lock
 from connections import ManagedConnection, AbstractCursor, RowBase
+from caches import LRUCache
 from new import instancemethod
+from array import array
+import re
 
 __all__ = [
-    'SQLCursor', 'GenericSQL_URL', 'SQLConnection', 'SybaseConnection',
-    'GadflyURL', 'GadflyConnection'
+    'SQLCursor', 'AsyncSQLCursor', 'GenericSQL_URL', 'SQLConnection',
+    'SybaseConnection', 'GadflyURL', 'GadflyConnection', 'QueryStats',
+    'normalizeSQL', 'Statement',
 ]
 
 
@@ -21,6 +26,133 @@ def _nothing():
 def NullConverter(descr,value):
     return value
 
+def _typecodesFor(typecodes, description):
+    """Return 'typecodes' (default: all 'None') for 'description's columns"""
+    if typecodes is None:
+        return [None] * len(description)
+    if len(typecodes)!=len(description):
+        raise ValueError(
+            "Got %d typecodes for %d columns"
+            % (len(typecodes), len(description)), typecodes
+        )
+    return typecodes
+
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+def normalizeSQL(sql):
+    """Return 'sql' with literals replaced by '?' and whitespace collapsed"""
+    return ' '.join(_literals.sub('?', sql).split())
+
+
+class QueryStats(object):
+
+    """Aggregate timing statistics for one (normalized) SQL statement"""
+
+    __slots__ = (
+        'statement', 'count', 'errors', 'rows', 'execTime', 'fetchTime',
+        'maxTime',
+    )
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.count = self.errors = self.rows = 0
+        self.execTime = self.fetchTime = self.maxTime = 0.0
+
+    def totalTime(self):
+        return self.execTime + self.fetchTime
+
+
+_namedParams = re.compile(r"('(?:[^']|'')*')|(?<!:):([A-Za-z_]\w*)|(%)")
+
+class Statement(object):
+
+    """SQL using ':name' parameters, translated to a driver's paramstyle
+
+    'sql' is the translated SQL.  'names' is the list of parameter names in
+    the order the driver expects them, or 'None' if the driver takes a
+    dictionary of named parameters.  If 'escapePercent' is true (as it must
+    be for the 'format' and 'pyformat' paramstyles), any '%' characters in
+    the original SQL are doubled, so the driver won't take them for
+    parameter markers.  (Unless there are no parameters, since then the
+    driver isn't asked to do any substitution.)"""
+
+    __slots__ = 'sql', 'names', 'hasParams', '__weakref__'
+
+    def __init__(self, sql, newParams, addParam, escapePercent=False):
+
+        params = newParams()
+        escape = [escapePercent]
+
+        def replace(match):
+            literal, name, percent = match.groups()
+            if name is not None:
+                return addParam(params, name, name)
+            if percent is not None:
+                literal = percent
+            if escape[0]:
+                return literal.replace('%','%%')
+            return literal
+
+        self.sql = _namedParams.sub(replace, sql)
+        self.hasParams = len(params)>0
+
+        if escapePercent and not self.hasParams:
+            escape[0] = False
+            self.sql = _namedParams.sub(replace, sql)
+
+        if isinstance(params,dict):
+            self.names = None
+        else:
+            self.names = list(params)
+
+    def bind(self, values={}):
+        """Return '(sql,params)' to execute with parameter dict 'values'
+
+        'params' is 'None' if the statement has no parameters, so that the
+        driver won't do any parameter substitution at all."""
+
+        if not self.hasParams:
+            return self.sql, None
+        if self.names is None:
+            return self.sql, values
+        return self.sql, tuple([values[name] for name in self.names])
+
+
+def compileRowConverter(converters, post=None):
+
+    """Return a function that applies 'converters' to a row, then 'post'
+
+    'converters' is a sequence of '(converter,descr)' pairs, one per column;
+    'converter' is called as 'converter(descr,value)', unless it's
+    'NullConverter', in which case the value is used as-is.  The generated
+    function unpacks the row and calls each converter directly, instead of
+    looping over the columns."""
+
+    names = []
+    values = []
+    ns = {'post': post}
+
+    for i, (conv, descr) in enumerate(converters):
+        name = 'v%d' % i
+        names.append(name)
+        if conv is NullConverter:
+            values.append(name)
+        else:
+            ns['c%d' % i] = conv
+            ns['d%d' % i] = descr
+            values.append('c%d(d%d,%s)' % (i,i,name))
+
+    result = '[%s]' % ', '.join(values)
+    if post is not None:
+        result = 'post(%s)' % result
+
+    exec "def convert(row):\n    %s, = row\n    return %s\n" % (
+        ', '.join(names), result
+    ) in ns
+
+    return ns['convert']
+
 def named_param_adder(format):
     def adder(params, value, name=None):
         if name is None:
@@ -47,7 +179,15 @@ class SQLCursor(AbstractCursor):
     multiOK = False
     defaultFormat = "sql"
 
-    _cursor = binding.Make(lambda self: self._conn.cursor())
+    stream = False      # use a server-side cursor, if the driver has them?
+    fetchSize = None    # rows per fetch; 'None' means the driver's arraysize
+
+    def _cursor(self):
+        if self.stream:
+            return self.conn._streamingCursor(self._conn)
+        return self._conn.cursor()
+
+    _cursor = binding.Make(_cursor)
 
 
     def close(self):
@@ -93,19 +233,32 @@ class SQLCursor(AbstractCursor):
 
     __path = binding.Make(lambda self: binding.getComponentPath(self))
 
+    _timedQuery = None  # statement to record fetch time for, if timing
+    prepared = False    # use 'conn.getStatement()' for ':name' parameters?
+
     def execute(self, *args):
 
-        self.conn.setTxnState(self.outsideTxn)
+        conn = self.conn
+        conn.setTxnState(self.outsideTxn)
 
-        try:
+        sql = args[0]
+        if self.prepared:
+            args = conn.getStatement(sql).bind(*args[1:])
+            if args[1] is None:
+                args = args[:1]
+
+        timed = conn.timeQueries
+        if timed:
+            clock = conn.clock
+            start = clock()
 
-            # XXX need some sort of flags for timing/logging here
-            # XXX perhaps best handled as cursor subclass(es) set on
-            # XXX the SQLConnection?
+        try:
+            result = self._cursor.execute(*args)
 
-            return self._cursor.execute(*args)
+        except conn.Exceptions:
 
-        except self.conn.Exceptions:
+            if timed:
+                conn.recordQuery(sql, clock()-start, failed=True)
 
             __traceback_info__ = args
 
@@ -118,30 +271,137 @@ class SQLCursor(AbstractCursor):
             self.conn.closeASAP()    # close connection after error
             raise
 
+        if timed:
+            elapsed = clock()-start
+            conn.recordQuery(sql, elapsed)
+            self._timedQuery = sql, elapsed
 
+        return result
 
 
-    def __iter__(self):
-        if not self._cursor.description:
-            return
+    def executemany(self, operation, seq_of_parameters):
 
-        fetch = self._cursor.fetchmany
-        rows = fetch()
+        """Execute 'operation' for each of a sequence of parameter sets"""
 
-        if rows:
-            descr = self._cursor.description
+        conn = self.conn
+        conn.setTxnState(self.outsideTxn)
 
-            rowStruct = makeStructType('rowStruct',
-                [d[0] for d in descr], RowBase,
-                __module__ = __name__,
+        sql = operation
+        executemany = None
+
+        if self.prepared:
+            stmt = conn.getStatement(sql)
+            operation = stmt.sql
+            if stmt.hasParams:
+                seq_of_parameters = [
+                    stmt.bind(params)[1] for params in seq_of_parameters
+                ]
+            else:
+                # Like 'execute()', don't let the driver substitute into it
+                executemany = self._executeEach
+
+        if executemany is None:
+            executemany = self._cursor.executemany
+
+        timed = conn.timeQueries
+        if timed:
+            clock = conn.clock
+            start = clock()
+
+        try:
+            result = executemany(operation, seq_of_parameters)
+
+        except conn.Exceptions:
+
+            if timed:
+                conn.recordQuery(sql, clock()-start, failed=True)
+
+            __traceback_info__ = operation
+
+            self.logger.exception(
+                "%s: error executing SQL query: %s\n"
+                "Traceback:",
+                self.__path, operation
             )
 
-            # mkTuple is a curried constructor for our new 'rowStruct' type
-            mkTuple = instancemethod(tuple.__new__,rowStruct,None)
+            self.conn.closeASAP()    # close connection after error
+            raise
 
-            # Now get a row conversion function for our description, using
-            # our rowStruct constructor as a postprocessor
-            converter = self.conn.getRowConverter(descr,mkTuple)
+        if timed:
+            conn.recordQuery(sql, clock()-start)
+
+        return result
+
+
+    def _executeEach(self, operation, seq_of_parameters):
+        """Execute parameterless 'operation' once per parameter set"""
+        cursor = self._cursor
+        for params in seq_of_parameters:
+            cursor.execute(operation)
+
+
+
+
+    def _timedFetch(self, fetch):
+
+        """Wrap 'fetch' to record fetch time and row count when finished"""
+
+        (sql, execTime), self._timedQuery = self._timedQuery, None
+        conn = self.conn
+        clock = conn.clock
+        totals = [0.0, 0]
+
+        def timedFetch(*args):
+            start = clock()
+            rows = fetch(*args)
+            totals[0] += clock()-start
+            totals[1] += len(rows)
+            if not rows:
+                conn.recordFetch(sql, execTime, totals[0], totals[1])
+            return rows
+
+        return timedFetch
+
+
+    def _fetcher(self):
+
+        """Return a function to fetch the next batch of rows, or 'None'
+
+        The function takes an optional argument to override the number of
+        rows to fetch."""
+
+        cursor = self._cursor
+
+        # Server-side cursors may not have a description until fetched from
+        if not cursor.description and not self.stream:
+            return None
+
+        size = self.fetchSize
+        if size is None and self.stream:
+            size = self.conn.streamArraySize
+
+        if size:
+            fetch = lambda n=size: cursor.fetchmany(n)
+        else:
+            fetch = cursor.fetchmany
+
+        if self._timedQuery is not None:
+            fetch = self._timedFetch(fetch)
+
+        return fetch
+
+
+    def __iter__(self):
+
+        fetch = self._fetcher()
+        if fetch is None:
+            return
+
+        cursor = self._cursor
+        rows = fetch()
+
+        if rows:
+            converter = self.conn.getRowFactory(cursor.description)
 
         while rows:
 
@@ -155,11 +415,158 @@ class SQLCursor(AbstractCursor):
             raise exceptions.TooManyResults
 
 
+    def iterBatches(self, typecodes=None):
+
+        """Yield the current result set as a series of lists of columns
+
+        Each batch holds up to 'fetchSize' rows (or the cursor's 'arraysize'),
+        as one sequence per column, with each column's type converter
+        applied to the whole column at once.  If 'typecodes' is supplied, it
+        should contain an 'array' module typecode (or 'None') for each
+        column; those columns are returned as 'array.array' objects instead
+        of lists.  (Which can be wrapped with e.g. 'numpy.frombuffer()', if
+        needed.)  No row objects are created."""
+
+        fetch = self._fetcher()
+        if fetch is None:
+            return
+
+        rows = fetch()
+
+        if rows:
+            description = self._cursor.description
+            converters = zip(
+                self.conn.getColumnConverters(description), description
+            )
+            typecodes = _typecodesFor(typecodes, description)
+
+        while rows:
+
+            columns = []
+
+            for (conv, d), typecode, column in zip(
+                converters, typecodes, zip(*rows)
+            ):
+                if conv is not NullConverter:
+                    column = map(conv, [d]*len(column), column)
+                if typecode is None:
+                    columns.append(list(column))
+                else:
+                    columns.append(array(typecode, list(column)))
+
+            yield columns
+            rows = fetch()
+
+        if not self.multiOK and self.nextset():
+            raise exceptions.TooManyResults
+
+
+    def fetchColumns(self, typecodes=None):
+
+        """Return the rest of the current result set as a list of columns
+
+        This is like combining all of the batches from 'iterBatches()'."""
+
+        columns = None
+
+        for batch in self.iterBatches(typecodes):
+            if columns is None:
+                columns = batch
+            else:
+                for column, more in zip(columns, batch):
+                    column.extend(more)
+
+        if columns is None:
+            description = self._cursor.description or ()
+            typecodes = _typecodesFor(typecodes, description)
+            columns = [
+                (typecode is None and [] or array(typecode))
+                    for typecode in typecodes
+            ]
+
+        return columns
+
+
+class AsyncSQLCursor(SQLCursor):
+
+    """SQL cursor whose queries and fetches don't block the event loop
+
+    'execute()', 'executemany()', 'fetchmany()', 'fetchall()', and
+    'fetchColumns()' return an 'events.IEventSource' instead of a result.
+    A task yields it, and 'events.resume()' then returns the result (or
+    raises the error).  For example::
+
+        cursor = conn.asyncCursor()
+        yield cursor.execute("SELECT * FROM foo"); events.resume()
+        yield cursor.fetchall(); rows = events.resume()
+
+    The work is done by the connection's '_asyncCall()' method, which uses a
+    worker thread from the 'events.IThreadPool' by default.  Only one call
+    per connection runs at a time, and the connection shouldn't be used in
+    any other way while a call is outstanding."""
+
+    _asyncFetch = None  # fetch function for the current result set
+
+    def execute(self, *args):
+        self._startAsync()
+        return self.conn._asyncCall(SQLCursor.execute, self, *args)
+
+
+    def executemany(self, operation, seq_of_parameters):
+        self._startAsync()
+        return self.conn._asyncCall(
+            SQLCursor.executemany, self, operation, seq_of_parameters
+        )
+
+
+    def fetchmany(self, size=None):
+        """Event source for a list of up to 'size' rows ('[]' at end)
+
+        'size' defaults to the cursor's 'fetchSize', or the driver's
+        'arraysize'."""
+        return self.conn._asyncCall(self._fetchRows, size)
+
+
+    def fetchall(self):
+        """Event source for a list of the rest of the result set's rows"""
+        return self.conn._asyncCall(self._fetchAll)
+
+
+    def fetchColumns(self, typecodes=None):
+        """Event source for the rest of the result set, as columns"""
+        return self.conn._asyncCall(SQLCursor.fetchColumns, self, typecodes)
+
+
+    def _startAsync(self):
+        # Join the transaction and open the cursor in the event loop's thread
+        self.conn.setTxnState(self.outsideTxn)
+        self._cursor
+        self._asyncFetch = None
+
 
+    def _fetchRows(self, size=None):
 
+        fetch = self._asyncFetch
+        if fetch is None:
+            fetch = self._asyncFetch = self._fetcher() or (lambda *args: [])
 
+        if size is None:
+            rows = fetch()
+        else:
+            rows = fetch(size)
+        if rows:
+            converter = self.conn.getRowFactory(self._cursor.description)
+            rows = [converter(row) for row in rows]
+        return rows
 
 
+    def _fetchAll(self):
+        rows = []
+        batch = self._fetchRows()
+        while batch:
+            rows.extend(batch)
+            batch = self._fetchRows()
+        return rows
 
 
 class SQLConnection(ManagedConnection):
@@ -217,6 +624,160 @@ class SQLConnection(ManagedConnection):
 
     log = binding.Obtain('logger:sql')
 
+    collectStats = binding.Obtain(
+        PropertyName('peak.storage.sql.collectStats'), default=False
+    )
+
+    slowQueryTime = binding.Obtain(
+        PropertyName('peak.storage.sql.slowQueryTime'), default=None
+    )
+
+    timeQueries = binding.Make(
+        lambda self: self.collectStats or self.slowQueryTime is not None
+    )
+
+    slowLog = binding.Obtain('logger:sql.slow')
+    clock = binding.Obtain('import:time.time')
+    queryStats = binding.Make(dict)
+
+
+    def recordQuery(self, sql, elapsed, failed=False):
+
+        """Record execution of 'sql', taking 'elapsed' seconds"""
+
+        if self.collectStats:
+            stats = self._statsFor(sql)
+            stats.count += 1
+            stats.execTime += elapsed
+            stats.maxTime = max(stats.maxTime, elapsed)
+            if failed:
+                stats.errors += 1
+
+        slow = self.slowQueryTime
+        if slow is not None and elapsed>=slow:
+            self.slowLog.warning(
+                "Slow query (%.3f secs): %s", elapsed, sql
+            )
+
+
+    def recordFetch(self, sql, execTime, elapsed, rows):
+
+        """Record fetching 'rows' rows of 'sql' results in 'elapsed' secs"""
+
+        if self.collectStats:
+            stats = self._statsFor(sql)
+            stats.fetchTime += elapsed
+            stats.rows += rows
+            stats.maxTime = max(stats.maxTime, execTime+elapsed)
+
+        slow = self.slowQueryTime
+        if slow is not None and execTime < slow <= execTime+elapsed:
+            self.slowLog.warning(
+                "Slow query (%.3f secs, %d rows): %s",
+                execTime+elapsed, rows, sql
+            )
+
+
+    streamArraySize = binding.Obtain(
+        PropertyName('peak.storage.sql.streamArraySize')
+    )
+
+    def _streamingCursor(self, conn):
+        """Return a server-side cursor for 'conn', if the driver has them
+
+        This is used for cursors created with 'stream=True', which are read
+        'fetchSize' rows at a time (default: 'streamArraySize').  The
+        default just returns an ordinary cursor."""
+        return conn.cursor()
+
+
+    threadPool = binding.Obtain(events.IThreadPool)
+    _asyncLock = binding.Make(allocate_lock)
+
+    def asyncCursor(self, **kw):
+        """Return an 'AsyncSQLCursor' for this connection"""
+        return AsyncSQLCursor(self, **kw)
+
+
+    def _asyncCall(self, func, *args):
+
+        """Return an 'events.IEventSource' for 'func(*args)'
+
+        This is used by 'AsyncSQLCursor' to run DB-API calls without
+        blocking the event loop.  The default runs them one at a time, in
+        worker threads from 'threadPool'.  Drivers with their own
+        non-blocking interface can override this."""
+
+        lock = self._asyncLock
+
+        def call():
+            lock.acquire()
+            try:
+                return func(*args)
+            finally:
+                lock.release()
+
+        return self.threadPool.call(call)
+
+
+    statementCacheSize = binding.Obtain(
+        PropertyName('peak.storage.sql.statementCacheSize')
+    )
+
+    statementCache = binding.Make(
+        lambda self: LRUCache(
+            self, maxEntries=self.statementCacheSize, timeToLive=None
+        )
+    )
+
+    def getStatement(self, sql):
+        """See ISQLConnection.getStatement()"""
+        stmt = self.statementCache.get(sql)
+        if stmt is None:
+            stmt = self.statementCache[sql] = Statement(
+                sql, self.newParams, self.addParam,
+                self.paramstyle in ('format','pyformat')
+            )
+        return stmt
+
+
+    def getQueryStats(self):
+        """Return 'QueryStats' for executed statements, slowest first"""
+        items = [(-s.totalTime(), s.statement, s)
+            for s in self.queryStats.values()]
+        items.sort()
+        return [s for t,k,s in items]
+
+
+    def resetQueryStats(self):
+        self.queryStats.clear()
+
+
+    def _statsFor(self, sql):
+        key = normalizeSQL(sql)
+        stats = self.queryStats.get(key)
+        if stats is None:
+            stats = self.queryStats[key] = QueryStats(key)
+        return stats
+
+
+    pingSQL = binding.Obtain(
+        PropertyName('peak.storage.pool.pingSQL'), default=None
+    )
+
+    def _ping(self, conn):
+        """Run 'pingSQL' (if set) on 'conn', to see if it's still alive"""
+        if not self.pingSQL:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.pingSQL)
+            cursor.fetchall()
+            cursor.close()
+        except:
+            return False
+        return True
+
     def voteForCommit(self, txnService):
         super(SQLConnection,self).voteForCommit(txnService)
         if self.twoPhase:
@@ -237,37 +798,73 @@ class SQLConnection(ManagedConnection):
     def _prepare(self):
         raise NotImplementedError("Two-phase commit not implemented", self)
 
+    paramstyle = binding.Make(lambda s: s.API.paramstyle)
+
     newParams = binding.Make(
-        lambda s: s.TYPES_NS['paramstyles.'+s.API.paramstyle]
+        lambda s: s.TYPES_NS['paramstyles.'+s.paramstyle]
     )
     addParam =  binding.Make(
-        lambda s: s.TYPES_NS['paramadders.'+s.API.paramstyle]
+        lambda s: s.TYPES_NS['paramadders.'+s.paramstyle]
     )
 
     def getRowConverter(self,description,post=None):
         """See ISQLConnection.getRowConverter()"""
 
         typeMap = self.typeMap
-        converters = [
-            instancemethod(
-                typeMap.get(d[1],NullConverter), d, None
-            ) for d in description
-        ]
-
-        for conv in converters:
-            if conv.im_func is not NullConverter:
+        converters = [(typeMap.get(d[1],NullConverter), d) for d in description]
+
+        for conv, d in converters:
+            if conv is not NullConverter:
                 # At least one conversion, so we must create a row converter
-                if post is None:
-                    return lambda row: [
-                        conv(col) for (col,conv) in zip(row,converters)
-                    ]
-                else:
-                    return lambda row: post(
-                        [conv(col) for (col,conv) in zip(row,converters)]
-                    )
+                return compileRowConverter(converters, post)
         else:
             return post     # No conversions other than postprocessor
 
+
+    def getColumnConverters(self,description):
+        """See ISQLConnection.getColumnConverters()"""
+        typeMap = self.typeMap
+        return [typeMap.get(d[1],NullConverter) for d in description]
+
+
+    rowFactoryCacheSize = 100
+    _rowFactories = binding.Make(dict)
+
+    def getRowFactory(self,description):
+
+        """Return a function that turns rows for 'description' into structs
+
+        The struct type and converter for each distinct description are
+        created once and cached, so that repeated queries don't keep creating
+        new struct classes and converter functions."""
+
+        try:
+            key = tuple([tuple(d) for d in description])
+            factory = self._rowFactories.get(key)
+        except TypeError:   # unhashable description, don't cache
+            key = factory = None
+
+        if factory is None:
+
+            rowStruct = makeStructType('rowStruct',
+                [d[0] for d in description], RowBase,
+                __module__ = __name__,
+            )
+
+            # mkTuple is a curried constructor for our new 'rowStruct' type
+            mkTuple = instancemethod(tuple.__new__,rowStruct,None)
+
+            # Now get a row conversion function for our description, using
+            # our rowStruct constructor as a postprocessor
+            factory = self.getRowConverter(description,mkTuple)
+
+            if key is not None:
+                if len(self._rowFactories) >= self.rowFactoryCacheSize:
+                    self._rowFactories.clear()
+                self._rowFactories[key] = factory
+
+        return factory
+
     dbTxnStarted = True
     txnAttrs = ManagedConnection.txnAttrs + ('dbTxnStarted',)
 
@@ -297,6 +894,9 @@ class MockSQLConnection(SQLConnection):
     def getRowConverter(self,description,post=None):
         return post     # provide() should be given pre-converted values
 
+    def getColumnConverters(self,description):
+        return [NullConverter] * len(description)
+
 
 class ValueBasedTypeConn(SQLConnection):
 
@@ -689,6 +1289,16 @@ class PsycopgConnection(PGSQLConnection):
         'INTERVAL', 'LONGINTEGER', 'NUMBER', 'ROWID', 'STRING', 'TIME'
     )
 
+    streamCount = 0
+
+    def _streamingCursor(self, conn):
+        # A named cursor is a server-side cursor, in psycopg 1.1 and up
+        self.streamCount += 1
+        try:
+            return conn.cursor('peak_stream_%d' % self.streamCount)
+        except TypeError:
+            return conn.cursor()
+
 
 
 
@@ -774,6 +1384,11 @@ class PyMySQLConnection(ValueBasedTypeConn):
             user=a.user or '', passwd=a.passwd or '',
         )
 
+    def _streamingCursor(self, conn):
+        # Unbuffered cursor; note that MySQL won't run other queries on the
+        # connection until it's been read to the end or closed
+        return conn.cursor(importObject(self.DRIVER+'.cursors:SSCursor'))
+
 class MySQLDBConnection(PyMySQLConnection):
     DRIVER = "MySQLdb"
 
@@ -988,7 +1603,11 @@ class CXOracleConnection(OracleBase):
 
     def _open(self):
         a = self.address
-        return self.API.connect(a.user, a.passwd, a.server)
+        conn = self.API.connect(a.user, a.passwd, a.server)
+        if hasattr(conn,'stmtcachesize'):
+            # let the driver keep server-side parsed statements for us
+            conn.stmtcachesize = self.statementCacheSize
+        return conn
 
 
     supportedTypes = (
@@ -1,10 +1,10 @@
-from peak.api import binding, protocols
+from peak.api import binding, protocols, PropertyName, NOT_FOUND
 from interfaces import *
 from weakref import WeakValueDictionary
 
 
 __all__ = [
-    'WeakCache', 'PermanentCache', 'NullCache',
+    'WeakCache', 'PermanentCache', 'NullCache', 'LRUCache',
 ]
 
 
@@ -57,26 +57,209 @@ class NullCache(CacheBase):
 
 
 
+class LRUCache(CacheBase):
 
+    """Keeps the 'maxEntries' most recently used items, plus any in use
 
+    Like a 'WeakCache', an 'LRUCache' keeps items for as long as they're in
+    use elsewhere.  In addition, it holds strong references to the
+    'maxEntries' most recently stored or retrieved items, so that frequently
+    used items stay cached even when nothing else refers to them.  If
+    'timeToLive' is set, items older than that many seconds (according to
+    'clock()') are discarded instead of being returned.
 
+    'maxEntries' and 'timeToLive' default to the
+    'peak.storage.caches.maxEntries' and 'peak.storage.caches.timeToLive'
+    properties.  The 'hits', 'misses', and 'evictions' attributes count
+    lookups that found an item, lookups that didn't, and items pushed out of
+    the most-recently-used window; 'resetCounters()' zeroes them.
 
+    Items must be weak-referenceable, as with 'WeakCache'."""
 
+    maxEntries = binding.Obtain(
+        PropertyName('peak.storage.caches.maxEntries')
+    )
+
+    timeToLive = binding.Obtain(
+        PropertyName('peak.storage.caches.timeToLive')
+    )
+
+    clock = binding.Obtain('import:time.time')
+
+    hits = misses = evictions = 0
+
+    _weak    = binding.Make(WeakValueDictionary)  # key -> item, for all items
+    _links   = binding.Make(dict)   # key -> '[prev,next,key,item,expires]'
+    _expires = binding.Make(dict)   # key -> expiration time, if 'timeToLive'
+
+    def _root(self):
+        root = [None, None, None, None, None]
+        root[0] = root[1] = root    # empty circular list: newest is root[1]
+        return root
+
+    _root = binding.Make(_root)
+
+
+    def get(self, key, default=None):
+        item = self._lookup(key)
+        if item is NOT_FOUND:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return item
+
+
+    def __getitem__(self, key):
+        item = self.get(key, NOT_FOUND)
+        if item is NOT_FOUND:
+            raise KeyError(key)
+        return item
+
+
+    def __contains__(self, key):
+        return self._lookup(key) is not NOT_FOUND
+
+    has_key = __contains__
+
+
+    def __setitem__(self, key, item):
+
+        expires = None
+        if self.timeToLive:
+            expires = self._expires[key] = self.clock() + self.timeToLive
+
+        self._weak[key] = item
+        link = self._links.get(key)
+
+        if link is None:
+            self._remember(key, item, expires)
+        else:
+            link[3] = item
+            link[4] = expires
+            self._moveToFront(link)
+
+
+    def __delitem__(self, key):
+        del self._weak[key]
+        self._forget(key)
+
+
+    def __len__(self):
+        return len(self._weak)
+
+
+    def clear(self):
+        self._weak.clear()
+        self._links.clear()
+        self._expires.clear()
+        root = self._root
+        root[0] = root[1] = root
+
+
+    def items(self):
+        if self.timeToLive:
+            now = self.clock()
+            expires = self._expires
+            return [
+                (key,item) for key,item in self._weak.items()
+                    if expires.get(key,now) > now
+            ]
+        return self._weak.items()
+
+
+    def keys(self):
+        return [key for key,item in self.items()]
+
+
+    def values(self):
+        return [item for key,item in self.items()]
+
+
+    def resetCounters(self):
+        """Zero the 'hits', 'misses', and 'evictions' counts"""
+        self.hits = self.misses = self.evictions = 0
+
+
+    def _lookup(self, key):
+
+        link = self._links.get(key)
+
+        if link is not None:
+            if link[4] is not None and link[4] <= self.clock():
+                self._expire(key)
+                return NOT_FOUND
+            self._moveToFront(link)
+            return link[3]
+
+        # Not in the strong window, but may still be in use elsewhere
+        item = self._weak.get(key, NOT_FOUND)
 
+        if item is not NOT_FOUND:
+            expires = None
+            if self.timeToLive:
+                expires = self._expires.get(key)
+                if expires is None or expires <= self.clock():
+                    self._expire(key)
+                    return NOT_FOUND
+            self._remember(key, item, expires)
 
+        return item
 
 
+    def _expire(self, key):
+        if key in self._weak:
+            del self._weak[key]
+        self._forget(key)
 
 
+    def _forget(self, key):
+        link = self._links.pop(key, None)
+        if link is not None:
+            self._unlink(link)
+        self._expires.pop(key, None)
 
 
+    def _unlink(self, link):
+        prev, next = link[0], link[1]
+        prev[1] = next
+        next[0] = prev
 
 
+    def _moveToFront(self, link):
+        root = self._root
+        if root[1] is not link:
+            self._unlink(link)
+            self._linkFirst(root, link)
 
 
+    def _linkFirst(self, root, link):
+        first = root[1]
+        link[0] = root
+        link[1] = first
+        first[0] = root[1] = link
 
 
+    def _remember(self, key, item, expires):
 
+        links = self._links
+        root = self._root
 
+        link = [None, None, key, item, expires]
+        self._linkFirst(root, link)
+        links[key] = link
 
+        if len(links) > self.maxEntries:
+            oldest = root[0]
+            self._unlink(oldest)
+            del links[oldest[2]]
+            self.evictions += 1
 
+            # Evicted items whose only reference was our window drop out of
+            # the weak dictionary, so purge their expiration times from time
+            # to time
+            expires = self._expires
+            if len(expires) > 2*len(self._weak) + len(links):
+                weak = self._weak
+                for key in expires.keys():
+                    if key not in weak:
+                        del expires[key]
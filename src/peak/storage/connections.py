@@ -3,10 +3,12 @@ from peak.api import *
 from transactions import TransactionComponent
 from interfaces import *
 from weakref import WeakValueDictionary
+from peak.util.threads import allocate_lock
 
 
 __all__ = [
-    'ManagedConnection', 'AbstractCursor', 'RowBase',
+    'ManagedConnection', 'AbstractCursor', 'RowBase', 'ConnectionPool',
+    'PoolURL',
 ]
 
 from peak.util.Struct import struct
@@ -169,9 +171,20 @@ class ManagedConnection(TransactionComponent):
         classProvides = [naming.IObjectFactory]
     )
 
-    connection = binding.Make(lambda self: self._open())
+    def connection(self):
+        if self.usePool:
+            return self.pool.checkout(self)
+        return self._open()
+
+    connection = binding.Make(connection)
     _closeASAP = False
 
+    usePool = binding.Obtain(
+        PropertyName('peak.storage.pool.enabled'), default=False
+    )
+    pool = binding.Obtain(IConnectionPool)
+    poolKey = binding.Make(lambda self: (self.__class__, str(self.address)))
+
     txnAttrs = TransactionComponent.txnAttrs + ('txnTime',)
 
     def closeASAP(self):
@@ -187,7 +200,14 @@ class ManagedConnection(TransactionComponent):
 
         if self._hasBinding('connection'):
             self.closeCursors()
-            self._close()
+            if self.usePool and not (self._closeASAP or self.inTransaction):
+                # Give the connection back to the pool, instead of closing
+                # (unless it may have uncommitted work)
+                self.pool.checkin(self, self.connection)
+            else:
+                self._close()
+                if self.usePool:
+                    self.pool.closed(self)
             del self.connection
 
         self._delBinding('_closeASAP')
@@ -196,7 +216,7 @@ class ManagedConnection(TransactionComponent):
     def finishTransaction(self, txnService, committed):
         super(ManagedConnection,self).finishTransaction(txnService, committed)
 
-        if self._closeASAP:
+        if self._closeASAP or self.usePool:
             self.close()
 
     def _open(self):
@@ -206,6 +226,17 @@ class ManagedConnection(TransactionComponent):
     def _close(self):
         """Actions to take before 'del self.connection', if needed."""
 
+    def _ping(self, conn):
+        """Return true if 'conn' is still usable (default: always true)"""
+        return True
+
+    def _discard(self, conn):
+        """Close a "real" connection that's being dropped by a pool"""
+        try:
+            conn.close()
+        except:
+            pass
+
     __txnTimeConverter = binding.Obtain(
         PropertyName('peak.storage.txnTimeType'), default=float
     )
@@ -288,3 +319,265 @@ class ManagedConnection(TransactionComponent):
 
 
 
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+
+class ConnectionPool(binding.Component):
+
+    """Pool of idle "real" connections; see 'storage.IConnectionPool'
+
+    Idle connections are kept per '(class,address)' key, and the most
+    recently used one is reused first.  Up to 'maxSize' idle connections are
+    kept for each key; of those, idle connections beyond the first 'minSize'
+    are closed once they've been unused for 'idleTimeout' seconds (if
+    'idleTimeout' is not 'None').  If 'maxOpen' is not 'None', no more than
+    that many connections (checked out or idle) are open for a key at once;
+    'checkout()' then waits up to 'checkoutTimeout' seconds for one to be
+    checked in, checking every 'pollInterval' seconds.  The defaults come
+    from the 'peak.storage.pool.*' properties."""
+
+    protocols.advise(
+        instancesProvide = [IConnectionPool]
+    )
+
+    minSize     = binding.Obtain(PropertyName('peak.storage.pool.minSize'))
+    maxSize     = binding.Obtain(PropertyName('peak.storage.pool.maxSize'))
+    idleTimeout = binding.Obtain(PropertyName('peak.storage.pool.idleTimeout'))
+    maxOpen     = binding.Obtain(PropertyName('peak.storage.pool.maxOpen'))
+
+    checkoutTimeout = binding.Obtain(
+        PropertyName('peak.storage.pool.checkoutTimeout')
+    )
+    pollInterval = 0.05
+
+    clock = binding.Obtain('import:time.time')
+    sleep = binding.Obtain('import:time.sleep')
+    lock  = binding.Make(allocate_lock)
+    idle  = binding.Make(dict)   # key -> [(lastUsed,conn)], oldest first
+
+    openCount = binding.Make(dict)  # key -> open connections (incl. idle)
+
+    checkouts = checkins = opened = reused = failedChecks = discarded = 0
+    timeouts = 0
+    waitTime = maxWait = 0.0
+
+
+    def checkout(self, conn):
+        """See 'storage.IConnectionPool.checkout()'"""
+
+        start = self.clock()
+        opened = reused = failed = timedOut = 0
+        waited = 0.0
+        try:
+            while True:
+                raw = self._reserve(conn)
+                if raw is None:
+                    # 'maxOpen' connections are in use; wait for a checkin
+                    now = self.clock()
+                    timeout = self.checkoutTimeout
+                    if timeout is not None and now-start>=timeout:
+                        timedOut = 1
+                        raise exceptions.PoolTimeout(
+                            "No connection available after %s secs" % timeout,
+                            conn.poolKey
+                        )
+                    self.sleep(self.pollInterval)
+                    waited += self.clock()-now
+                    continue
+
+                if raw is NOT_GIVEN:
+                    try:
+                        raw = conn._open()
+                    except:
+                        self.closed(conn)   # give back the reserved slot
+                        raise
+                    opened = 1
+                    break
+                elif conn._ping(raw):
+                    reused = 1
+                    break
+                failed += 1
+                self._discard(conn, [raw])
+        finally:
+            self.lock.acquire()
+            try:
+                self.checkouts += opened + reused
+                self.opened += opened
+                self.reused += reused
+                self.failedChecks += failed
+                self.timeouts += timedOut
+                self.waitTime += waited
+                self.maxWait = max(self.maxWait, waited)
+            finally:
+                self.lock.release()
+
+        return raw
+
+
+    def checkin(self, conn, raw):
+        """See 'storage.IConnectionPool.checkin()'"""
+
+        now = self.clock()
+        self.lock.acquire()
+        try:
+            self.checkins += 1
+            idle = self.idle.setdefault(conn.poolKey, [])
+            expired = self._expired(idle, now)
+            if len(idle)<self.maxSize:
+                idle.append((now,raw))
+            else:
+                expired.append(raw)
+        finally:
+            self.lock.release()
+
+        self._discard(conn, expired)
+
+
+    def closed(self, conn):
+        """See 'storage.IConnectionPool.closed()'"""
+        self._forget(conn.poolKey, 1)
+
+
+    def stats(self):
+        """See 'storage.IConnectionPool.stats()'"""
+
+        self.lock.acquire()
+        try:
+            idle = nOpen = 0
+            for conns in self.idle.values():
+                idle += len(conns)
+            for count in self.openCount.values():
+                nOpen += count
+
+            return {
+                'checkouts': self.checkouts, 'checkins': self.checkins,
+                'opened': self.opened, 'reused': self.reused,
+                'failedChecks': self.failedChecks,
+                'discarded': self.discarded, 'timeouts': self.timeouts,
+                'idle': idle, 'open': nOpen,
+                'waitTime': self.waitTime, 'maxWait': self.maxWait,
+            }
+        finally:
+            self.lock.release()
+
+
+    def resetCounters(self):
+        """See 'storage.IConnectionPool.resetCounters()'"""
+        self.lock.acquire()
+        try:
+            for attr in (
+                'checkouts', 'checkins', 'opened', 'reused', 'failedChecks',
+                'discarded', 'timeouts', 'waitTime', 'maxWait'
+            ):
+                self._delBinding(attr)
+        finally:
+            self.lock.release()
+
+
+    def _reserve(self, conn):
+
+        """Get the most-recently-used idle connection, or room to open one
+
+        Returns an idle connection, or 'NOT_GIVEN' if a new one may be
+        opened (in which case it's already counted as open), or 'None' if
+        'maxOpen' connections are already open."""
+
+        key = conn.poolKey
+        expired = []
+        raw = None
+
+        self.lock.acquire()
+        try:
+            idle = self.idle.get(key)
+            if idle:
+                expired = self._expired(idle, self.clock())
+                if idle:
+                    raw = idle.pop()[1]
+
+            if raw is None:
+                # Don't count the expired connections we're about to close
+                count = self.openCount.get(key,0)
+                if self.maxOpen is None or count-len(expired)<self.maxOpen:
+                    self.openCount[key] = count+1
+                    raw = NOT_GIVEN
+        finally:
+            self.lock.release()
+
+        self._discard(conn, expired)
+        return raw
+
+
+    def _expired(self, idle, now):
+        """Remove and return timed-out connections from 'idle' (locked)"""
+
+        expired = []
+        if self.idleTimeout is not None:
+            limit = now - self.idleTimeout
+            while len(idle)>self.minSize and idle[0][0]<=limit:
+                expired.append(idle.pop(0)[1])
+        return expired
+
+
+    def _discard(self, conn, raws):
+        if raws:
+            self.lock.acquire()
+            try:
+                self.discarded += len(raws)
+            finally:
+                self.lock.release()
+            self._forget(conn.poolKey, len(raws))
+        for raw in raws:
+            conn._discard(raw)
+
+
+    def _forget(self, key, count):
+        """Note that 'count' open connections for 'key' have been closed"""
+        self.lock.acquire()
+        try:
+            self.openCount[key] = max(0, self.openCount.get(key,0)-count)
+        finally:
+            self.lock.release()
+
+
+
+
+
+
+
+class PoolURL(naming.URL.Base):
+
+    """'pool:' URL, for a pooled version of another connection URL
+
+    Looking up e.g. 'pool:pgsql://user@server/db' returns the same kind of
+    connection object as 'pgsql://user@server/db', but with 'usePool' set, so
+    that it uses the service area's 'storage.IConnectionPool'."""
+
+    protocols.advise(
+        classProvides = [naming.IObjectFactory]
+    )
+
+    supportedSchemes = 'pool',
+    defaultFactory = 'peak.storage.connections.PoolURL'
+
+    def getObjectInstance(klass, context, refInfo, name, attrs=None):
+        addr, = refInfo.addresses
+        if isinstance(addr,str):
+            addr = naming.parseURL(context, addr)
+        conn = naming.lookup(context, addr.body)
+        conn.usePool = True
+        return conn
+
+    getObjectInstance = classmethod(getObjectInstance)
@@ -1,5 +1,6 @@
 """A variety of ways to render the data from a cursor to a file object"""
 
+from __future__ import generators
 from peak.api import *
 
 class AbstractCursorFormatter(binding.Component):
@@ -33,6 +34,24 @@ class AbstractCursorFormatter(binding.Component):
             self.printFooter(c, stdout, nrows)
 
 
+    def stringRows(self, c):
+
+        """Yield lists of rows of 'toStr()'-converted values from cursor 'c'
+
+        If the cursor has an 'iterBatches()' method, values are converted a
+        column at a time, without creating a row object for each row."""
+
+        toStr = self.toStr
+        batches = getattr(c, 'iterBatches', None)
+
+        if batches is None:
+            for r in c:
+                yield [[toStr(v) for v in r]]
+        else:
+            for columns in batches():
+                yield zip(*[map(toStr, column) for column in columns])
+
+
     def toStr(self, val, width=None):
         if type(val) is unicode:
             val = val.encode('utf8')
@@ -202,9 +221,11 @@ class cursorToCopy(AbstractCursorFormatter):
             
     def formatRows(self, c, stdout):
         nr = 0
-        for r in c:
-            print >>stdout, self.delim.join([self.toStr(v) for v in r])
-            nr += 1
+        delim = self.delim
+        for rows in self.stringRows(c):
+            for r in rows:
+                print >>stdout, delim.join(r)
+            nr += len(rows)
 
         return nr
 
@@ -257,10 +278,10 @@ class cursorToCSV(AbstractCursorFormatter):
         if self.header:
             wr.writerow([x[0] for x in c._cursor.description])
 
-        for r in c:
-            nr += 1
-            wr.writerow([self.toStr(v) for v in r])
-            
+        for rows in self.stringRows(c):
+            wr.writerows(rows)
+            nr += len(rows)
+
         return nr
 
 
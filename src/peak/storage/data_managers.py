@@ -1,4 +1,4 @@
-from peak.api import binding, model, protocols
+from peak.api import binding, model, protocols, NOT_GIVEN
 from interfaces import *
 from transactions import TransactionComponent
 from peak.persistence import Persistent, isGhost
@@ -7,7 +7,7 @@ from peak.util.ListProxy import ListProxy
 
 __all__ = [
     'FacadeDM', 'QueryDM', 'EntityDM', 'PersistentQuery', 'QueryLink',
-    'StorableDM',
+    'StorableDM', 'preloadGhosts',
 ]
 
 
@@ -70,6 +70,9 @@ class FacadeDM(binding.Component):
 
     preloadState = __getitem__
 
+    def preloadMany(self, oids):
+        return [self[oid] for oid in oids]
+
     cache = binding.Make('peak.storage.caches:WeakCache')
 
     def _retrieve(self, oid, state=None):
@@ -91,6 +94,28 @@ class PersistentQuery(Persistent, ListProxy):
 
     def __setstate__(self,state):
         self.data = list(state)
+        preloadGhosts(self.data)
+
+
+def preloadGhosts(obs):
+
+    """Arrange for ghosts in 'obs' to be loaded together, when one is used
+
+    Persistent ghosts in 'obs' are grouped by their data manager, and each
+    data manager that supports batch loading (i.e., a 'QueryDM' with a
+    non-zero 'loadBatchSize') will load the states of all the ghosts in its
+    group the first time any one of them is activated."""
+
+    groups = {}
+
+    for ob in obs:
+        if isinstance(ob,Persistent) and isGhost(ob):
+            jar = ob._p_jar
+            if getattr(jar,'loadBatchSize',None):
+                groups.setdefault(id(jar),(jar,[]))[1].append(ob._p_oid)
+
+    for jar, oids in groups.values():
+        jar._groupGhosts(oids)
 
 
 
@@ -242,6 +267,25 @@ class QueryLink(ListProxy):
 
 
 
+
+
+def _copyState(state):
+    """Return a copy of 'state' that's safe to hand to '__setstate__()'"""
+    if isinstance(state,dict):
+        return state.copy()
+    return state
+
+
+class CachedState(object):
+
+    """A loaded state held in a 'QueryDM.stateCache'"""
+
+    __slots__ = 'state', 'version', 'expires', '__weakref__'
+
+    def __init__(self, state, version=None, expires=None):
+        self.state = _copyState(state)
+        self.version = version
+        self.expires = expires
 
 
 class QueryDM(TransactionComponent):
@@ -285,12 +329,53 @@ class QueryDM(TransactionComponent):
 
     preloadState = __getitem__
 
+
+    def preloadMany(self, oids):
+
+        """See 'storage.IDataManager.preloadMany()'"""
+
+        if self.resetStatesAfterTxn:
+            # must always be used in a txn
+            self.joinedTxn
+
+        cache = self.cache
+        preloaded = self._preloaded
+        todo = []
+
+        for oid in oids:
+            if oid in preloaded or oid in self.to_delete:
+                continue
+            ob = cache.get(oid,self)
+            if ob is self or isinstance(ob,Persistent) and isGhost(ob):
+                todo.append(oid)
+
+        loaded = self._fetch(todo, True)   # keep refs until we return
+        return [self[oid] for oid in oids]
+
+
     # Private abstract methods/attrs
 
     cache = binding.Make('peak.storage.caches:WeakCache')
 
     defaultClass = PersistentQuery
 
+    loadBatchSize = 0   # max. oids per '_loadMany()'; 0 = no ghost grouping
+
+    _preloaded   = binding.Make(dict)   # oid -> state fetched for a ghost
+    _ghostGroups = binding.Make(dict)   # oid -> list of oids to load with it
+
+    stateCache = None       # second-level cache of states, shared across txns
+    stateTimeToLive = None  # seconds a state stays in 'stateCache', or None
+
+    stateCacheKey = binding.Make(lambda self: self.__class__)
+
+    _clock   = binding.Obtain('import:time.time')
+    _written = binding.Make(dict)   # oids written this txn; not cacheable
+
+    # The state version is checked once per transaction
+    txnAttrs = TransactionComponent.txnAttrs + ('_cacheVersion',)
+    _cacheVersion = binding.Make(lambda self: self._stateVersion())
+
     def _ghost(self, oid, state=None):
 
         klass = self.defaultClass
@@ -305,6 +390,179 @@ class QueryDM(TransactionComponent):
         raise NotImplementedError
 
 
+    def _loadMany(self, oids):
+
+        """Return a sequence of '(oid,state)' pairs for the existing 'oids'
+
+        The default implementation just calls '_load()' for each oid,
+        passing the oid's cached object if there is one, or 'None' if the
+        object hasn't been created yet.  Override it to load many states at
+        once (e.g. with a single 'WHERE key IN (...)' query), and set
+        'loadBatchSize' to the most oids you want to be asked for in one
+        call.  Oids that don't exist should simply be left out of the
+        result."""
+
+        states = []
+        cache = self.cache
+        for oid in oids:
+            try:
+                states.append((oid, self._load(oid, cache.get(oid))))
+            except InvalidKeyError:
+                pass
+        return states
+
+
+    def _fetch(self, oids, create=False):
+
+        """Load states for 'oids' via '_loadMany()'; return created objects
+
+        States found in 'stateCache' aren't reloaded.  States for objects
+        already in cache are saved for 'setstate()' to use; uncached objects
+        are created (if 'create' is true)."""
+
+        cache = self.cache
+        preloaded = self._preloaded
+        created = []
+        loaded = []
+        todo = []
+
+        for oid in oids:
+            state = self._cachedState(oid)
+            if state is NOT_GIVEN:
+                todo.append(oid)
+            else:
+                loaded.append((oid,state))
+
+        size = self.loadBatchSize or len(todo) or 1
+
+        for start in range(0, len(todo), size):
+            for oid, state in self._loadMany(todo[start:start+size]):
+                self._rememberState(oid,state)
+                loaded.append((oid,state))
+
+        keep = None
+
+        for oid, state in loaded:
+            ob = cache.get(oid,self)
+            if ob is not self:
+                if keep is None:
+                    keep = self._holdForTxn()
+                if keep:
+                    preloaded[oid] = state
+            elif create:
+                created.append(self.preloadState(oid,state))
+
+        return created
+
+
+    def _stateVersion(self):
+
+        """Return a token that changes whenever stored states change
+
+        Override this to return something cheap to compute, like a table's
+        last-modified time or a change counter.  It's called at most once per
+        transaction, and states cached under a different version are reloaded.
+        The default returns 'None', so only 'stateTimeToLive' and writes
+        through this DM invalidate cached states."""
+
+        return None
+
+
+    def _cachedState(self, oid):
+
+        """Return a copy of the cached state for 'oid', or 'NOT_GIVEN'"""
+
+        cache = self.stateCache
+        if cache is None or oid in self._written:
+            return NOT_GIVEN
+
+        entry = cache.get((self.stateCacheKey,oid))
+        if entry is None:
+            return NOT_GIVEN
+
+        if entry.version != self._cacheVersion or (
+            entry.expires is not None and entry.expires <= self._clock()
+        ):
+            self._forgetStates([oid], False)
+            return NOT_GIVEN
+
+        return _copyState(entry.state)
+
+
+    def _rememberState(self, oid, state):
+
+        """Save a just-loaded 'state' in 'stateCache', if it's cacheable"""
+
+        cache = self.stateCache
+        if cache is None or oid in self._written:
+            return
+
+        expires = self.stateTimeToLive
+        if expires is not None:
+            expires += self._clock()
+
+        cache[self.stateCacheKey,oid] = CachedState(
+            state, self._cacheVersion, expires
+        )
+
+
+    def _forgetStates(self, oids, written=True):
+
+        """Drop 'oids' from 'stateCache'; if 'written', don't recache them
+
+        Written oids aren't cached again until the transaction is over, since
+        their stored states may hold uncommitted changes."""
+
+        cache = self.stateCache
+        if cache is None:
+            return
+
+        key = self.stateCacheKey
+
+        for oid in oids:
+            if written:
+                self._written[oid] = True
+            try:
+                del cache[key,oid]
+            except KeyError:
+                pass
+
+
+    def _loadState(self, oid, ob):
+        """Return the cached state for 'oid', or '_load()' and cache it"""
+        state = self._cachedState(oid)
+        if state is NOT_GIVEN:
+            state = self._load(oid,ob)
+            self._rememberState(oid,state)
+        return state
+
+
+    def _groupGhosts(self, oids):
+        """Load all of 'oids' together, when the first is activated"""
+        if not self._holdForTxn():
+            return
+        groups = self._ghostGroups
+        for oid in oids:
+            groups[oid] = oids
+
+
+    def _holdForTxn(self):
+
+        """Join the current transaction, so '_preloaded' etc. are cleared
+
+        Batch-loaded states and ghost groups are only good for the
+        transaction they're from, and are cleared by 'finishTransaction()'.
+        Returns false if there's no transaction to join, in which case
+        nothing should be kept."""
+
+        if not self.inTransaction:
+            if not self.txnSvc.isActive():
+                return False
+            self.joinedTxn
+
+        return True
+
+
     # Persistence.IPersistentDataManager methods
 
     def setstate(self, ob):
@@ -315,7 +573,43 @@ class QueryDM(TransactionComponent):
 
         oid = ob._p_oid
         assert oid is not None
-        ob.__setstate__(self._load(oid,ob))
+
+        state = self._preloaded.pop(oid, NOT_GIVEN)
+
+        if state is NOT_GIVEN:
+            group = self._ghostGroups.pop(oid, None)
+
+            if group:
+                self._fetch(self._ungroup(oid, group))
+                state = self._preloaded.pop(oid, NOT_GIVEN)
+
+            if state is NOT_GIVEN:
+                state = self._loadState(oid,ob)
+
+        ob.__setstate__(state)
+
+
+    def _ungroup(self, oid, group):
+
+        """Remove 'group' from the ghost groups; return oids still needing load
+
+        The result includes 'oid' (being activated) and any other members of
+        the group that are still ghosts in the cache."""
+
+        groups = self._ghostGroups
+        cache = self.cache
+        todo = [oid]
+
+        for other in group:
+            if groups.get(other) is group:
+                del groups[other]
+                if other==oid or other in self._preloaded:
+                    continue
+                ob = cache.get(other)
+                if isinstance(ob,Persistent) and isGhost(ob):
+                    todo.append(other)
+
+        return todo
 
 
     def mtime(self, ob):
@@ -336,6 +630,16 @@ class QueryDM(TransactionComponent):
                 if isinstance(ob,Persistent):
                     ob._p_deactivate()
 
+        # Batch-loaded states are only good for the transaction they're from
+        self._preloaded.clear()
+        self._ghostGroups.clear()
+
+        # Forget written states again, in case another DM sharing our
+        # 'stateCache' loaded them before we committed
+        if self._written:
+            self._forgetStates(self._written.keys(), False)
+            self._written.clear()
+
         super(QueryDM,self).finishTransaction(txnService,committed)
 
     # Misc.
@@ -360,7 +664,7 @@ class QueryDM(TransactionComponent):
         elif oid in self.to_delete:
             return default
         try:
-            state = self._load(oid,None)
+            state = self._loadState(oid,None)
         except InvalidKeyError:
             return default
         else:
@@ -425,26 +729,47 @@ class EntityDM(QueryDM):
         else:
             obs = [ob]
 
+        # Group objects by operation and class, so they can be batched
+        groups = {}
+        order = []
+
         for ob in obs:
+            key = ob._p_oid is None, ob.__class__
+            if key in groups:
+                groups[key].append(ob)
+            else:
+                groups[key] = [ob]
+                order.append(key)
 
-            if ob._p_oid is None:
+        for key in order:
 
-                # No oid, it's a new object that needs saving
-                oid = ob._p_oid = self._new(ob)
-                self.cache[oid]=ob
+            isNew, klass = key
+            obs = groups[key]
+
+            if isNew:
+                # New objects that need saving; skip any that were already
+                # saved by an earlier '_new()' referencing them
+                obs = [ob for ob in obs if ob._p_oid is None]
+                for ob, oid in zip(obs, self._newMany(obs)):
+                    ob._p_oid = oid
+                    self.cache[oid]=ob
+                self._forgetStates([ob._p_oid for ob in obs])
 
             else:
-                # just save it the ordinary way
-                self._save(ob)
+                # just save them the ordinary way
+                self._forgetStates([ob._p_oid for ob in obs])
+                self._saveMany(obs)
 
             # Update status flags and object sets
-            key = id(ob)
-            markSaved(key,ob)
-            if key in dirty:
-                del dirty[key]
-            ob._p_changed = False
+            for ob in obs:
+                key = id(ob)
+                markSaved(key,ob)
+                if key in dirty:
+                    del dirty[key]
+                ob._p_changed = False
 
         if orig_ob is None and self.to_delete:
+            self._forgetStates(self.to_delete)
             self._delete_oids(self.to_delete)
             del self.to_delete
 
@@ -459,6 +784,21 @@ class EntityDM(QueryDM):
     def _new(self, ob):
         raise NotImplementedError
 
+    def _saveMany(self, obs):
+        """Save 'obs' (all of the same class); default calls '_save()'"""
+        for ob in obs:
+            self._save(ob)
+
+    def _newMany(self, obs):
+        """Create 'obs' (all of the same class), returning a list of oids"""
+        oids = []
+        for ob in obs:
+            oid = ob._p_oid
+            if oid is None:     # not saved by a previous '_new()' already
+                oid = ob._p_oid = self._new(ob)
+            oids.append(oid)
+        return oids
+
     def _defaultState(self, ob):
         return ob.__getstate__()
 
@@ -485,13 +825,19 @@ class EntityDM(QueryDM):
         #   DM is registered w/transaction if not previously registered
         key = id(ob)
 
-        # Ensure it's in the 'dirty' set
+        # Ensure it's in the 'dirty' set, and that we'll be asked to flush it
         self.dirty.setdefault(key,ob)
+        self.joinedTxn.markUnready(self)
+
+        # Any state batch-loaded for it is now out of date
+        self._preloaded.pop(ob._p_oid, None)
 
         return self.joinedTxn
 
     # ITransactionParticipant methods
 
+    tracksReadiness = True  # we call 'markUnready()' when we have new work
+
     def readyToVote(self, txnService):
         if self.dirty or self.to_delete:
             self.flush()
@@ -567,6 +913,9 @@ class EntityDM(QueryDM):
 
         self.to_delete.append(ob._p_oid)
 
+        if self.inTransaction:
+            self.joinedTxn.markUnready(self)
+
         # Ensure that we have a transaction service and we've joined
         # the transaction in progress...
         self.joinedTxn
@@ -11,7 +11,8 @@ __all__ = [
     'IDataManager', 'IDataManager_SPI', 'IWritableDM', 'IWritableDM_SPI',
     'IManagedConnection', 'IManagedConn_SPI', 'IKeyableDM', 'IIterableDM',
     'ISQLConnection', 'ILDAPConnection', 'IDDEConnection',
-    'ISQLObjectLister', 'ISQLDDLExtractor', 'InvalidKeyError'
+    'ISQLObjectLister', 'ISQLDDLExtractor', 'InvalidKeyError',
+    'IConnectionPool',
 ]
 
 
@@ -222,6 +223,24 @@ class ITransactionService(Interface):
     def removeParticipant(participant):
         """Force participant to be removed; for error handler use only"""
 
+    def markUnready(participant):
+        """Note that 'participant' has new work to do before it can vote
+
+        Participants with a true 'tracksReadiness' attribute must call this
+        whenever they receive writes (e.g. get new dirty objects), so that
+        they'll be asked 'readyToVote()' again during a commit.  Participants
+        without that attribute are always asked again if any participant
+        did work during the previous pass.  Calling this when no commit is
+        in progress has no effect."""
+
+    def getParticipantTimes():
+        """Return '(seconds,participant)' pairs, slowest first
+
+        'seconds' is the total time spent in the participant's
+        'readyToVote()', 'voteForCommit()', and 'commitTransaction()' methods
+        during the current transaction's commit (or the most recent
+        transaction, if none is in progress), for profiling slow commits."""
+
     # Getting/setting information about a transaction
 
     def isActive():
@@ -402,6 +421,14 @@ class IDataManager(IComponent,ITransactionParticipant):
     def preloadState(oid, state):
         """Pre-load 'state' for object designated by 'oid' and return it"""
 
+    def preloadMany(oids):
+        """Return a list of the objects designated by 'oids', loading together
+
+        This is like '[dm[oid] for oid in oids]', except that the states of
+        all the objects that aren't already loaded may be retrieved at once
+        (e.g. with a single query), instead of one at a time as each object
+        is used."""
+
 
 
 
@@ -496,6 +523,26 @@ class IDataManager_SPI(Interface):
     cache = Attribute("a cache for ghosts and loaded objects")
     defaultClass = Attribute("Default class used for '_ghost' method")
 
+    stateCache = Attribute(
+        """Optional 'ICache' of loaded states, kept across transactions
+
+        If set, states loaded by '_load()' or '_loadMany()' are saved here
+        (keyed by '(stateCacheKey,oid)'), and reused by later transactions
+        instead of being reloaded.  States written through the DM are
+        dropped from it.  Several DMs can share one cache, as long as their
+        'stateCacheKey' attributes differ (the default is the DM's class)."""
+    )
+
+    stateTimeToLive = Attribute(
+        """Seconds a state stays valid in 'stateCache' ('None' = forever)"""
+    )
+
+    def _stateVersion():
+        """Return a token that changes whenever the stored states change
+
+        Called at most once per transaction; cached states saved under a
+        different version are reloaded.  The default returns 'None'."""
+
     def _ghost(oid, state=None):
         """Return a ghost of appropriate class, based on 'oid' and 'state'
 
@@ -506,6 +553,10 @@ class IDataManager_SPI(Interface):
     def _load(oid, ob):
         """Load & return the state for 'oid', suitable for '__setstate__()'
 
+        'ob' is the object whose state is being loaded.  When states are
+        loaded ahead of time (see '_loadMany()'), the object may not exist
+        yet, in which case 'ob' is 'None'.
+
         Raise 'storage.InvalidKeyError' if 'oid' is not found in the db."""
 
 
@@ -518,6 +569,21 @@ class IWritableDM_SPI(IDataManager_SPI):
     def _new(ob):
         """Create 'ob' in underlying storage and return its new 'oid'"""
 
+    def _saveMany(obs):
+        """Save the objects in the list 'obs' to underlying storage
+
+        'EntityDM.flush()' groups dirty objects by class, and calls this
+        once per group of existing objects, so that e.g. an SQL DM can use
+        a single 'executemany()' to update them all.  The default calls
+        '_save()' for each object."""
+
+    def _newMany(obs):
+        """Create the objects in the list 'obs', returning a list of oids
+
+        Like '_saveMany()', but for new objects (e.g. using a multi-row
+        'INSERT').  The returned oids must be in the same order as 'obs'.
+        The default calls '_new()' for each object."""
+
     def _delete_oids(self,oidList):
         """Delete items listed in 'oidList' from underlying storage"""
 
@@ -639,6 +705,50 @@ class ISQLConnection(IManagedConnection):
         return 'None', indicating that no conversion of any kind is required.
         """
 
+    def getColumnConverters(description):
+        """Get a list of converter functions for 'description''s columns
+
+        Each converter is called as 'converter(descr,value)', where 'descr'
+        is the column's description tuple.  Columns that need no conversion
+        get 'SQL.NullConverter'.  This is used by cursors' 'iterBatches()'
+        and 'fetchColumns()' methods to convert whole columns at once."""
+
+    def getRowFactory(description):
+        """Get function to convert rows for 'description' into row structs
+
+        This is like 'getRowConverter()', except that the postprocessor is
+        the constructor of a struct type whose fields are named for the
+        description's columns.  The struct type and converter are cached for
+        each distinct 'description'."""
+
+    def getStatement(sql):
+        """Return a cached 'SQL.Statement' for 'sql' with ':name' parameters
+
+        The statement's 'sql' is 'sql' translated to the driver's paramstyle
+        (with literal '%' characters doubled for the 'format' and 'pyformat'
+        styles, if it has parameters), and its 'bind(values)' method returns
+        '(sql,params)' for a dictionary of parameter values, or '(sql,None)'
+        if the statement has no parameters.  Statements are kept in an LRU
+        cache of 'statementCacheSize' entries, so executing the same SQL
+        again passes the driver the identical SQL string, letting drivers
+        that cache parsed or prepared statements by SQL text reuse them.
+        Cursors created with 'prepared=True' (e.g. 'conn(sql, values,
+        prepared=True)') use this automatically."""
+
+    def getQueryStats():
+        """Return a list of 'SQL.QueryStats' objects, slowest first
+
+        Statistics are only collected if the connection's 'collectStats'
+        attribute is true (see the 'peak.storage.sql.collectStats'
+        property).  Statements are grouped after replacing their literal
+        values with '?', and each 'QueryStats' has the 'statement', its
+        execution 'count', 'errors', 'rows' fetched, total 'execTime' and
+        'fetchTime', and 'maxTime' (the slowest single execute-and-fetch).
+        """
+
+    def resetQueryStats():
+        """Discard the statistics collected so far"""
+
     DRIVER = Attribute(
         """The name of the DBAPI driver module for this connection"""
     )
@@ -650,6 +760,15 @@ class ISQLConnection(IManagedConnection):
     def setTxnState(outsideTxn):
         """Set the connection's PEAK and DB transaction state to match"""
 
+    def asyncCursor(**kw):
+        """Return an 'SQL.AsyncSQLCursor' for use by 'events.Task' code
+
+        The cursor's 'execute()' and fetch methods return event sources
+        instead of blocking, so that database access can overlap other I/O
+        in an event-driven process.  By default the DB-API calls are made in
+        worker threads from the connection's 'threadPool' (an
+        'events.IThreadPool')."""
+
 
 
 
@@ -689,6 +808,66 @@ class IManagedConn_SPI(Interface):
         to do so.
         """
 
+    def _ping(conn):
+        """Return true if 'conn' (a "real" connection) is still usable
+
+        This is used to check pooled connections before they're reused,
+        and by the 'running.ICheckableResource' adapter for managed
+        connections.  The default implementation always returns true.
+        """
+
+    def _discard(conn):
+        """Close 'conn', a "real" connection that's being thrown away
+
+        This is called by an 'IConnectionPool' for connections that failed
+        a '_ping()', went unused for too long, or didn't fit in the pool.
+        It should not raise errors.
+        """
+
+
+class IConnectionPool(Interface):
+
+    """Shared pool of "real" connections, for reuse by managed connections
+
+    Connections are pooled by the managed connection's class and address,
+    so that e.g. all 'pgsql:' connections to the same database share the
+    same idle connections.  A managed connection uses a pool if its
+    'usePool' attribute is true (see the 'peak.storage.pool.enabled'
+    property, and the 'pool:' URL scheme)."""
+
+    def checkout(conn):
+        """Return a "real" connection for the managed connection 'conn'
+
+        An idle connection for 'conn' is reused if one passes 'conn._ping()',
+        otherwise 'conn._open()' is used to open a new one.  If the pool
+        limits the number of open connections and they're all checked out,
+        this waits for one to be checked in, raising 'exceptions.PoolTimeout'
+        if none is in time."""
+
+    def checkin(conn, raw):
+        """Return 'raw', checked out by managed connection 'conn', to the pool
+
+        If the pool already has its maximum number of idle connections for
+        'conn', 'raw' is closed with 'conn._discard()' instead."""
+
+    def closed(conn):
+        """Managed connection 'conn' closed its connection instead of checkin
+
+        (E.g. because it was in a transaction.)  The pool then no longer
+        counts that connection as open."""
+
+    def stats():
+        """Return a dictionary of pool statistics
+
+        Keys include 'checkouts', 'checkins', 'opened', 'reused',
+        'failedChecks', 'discarded', 'timeouts', 'idle', 'open' (checked out
+        or idle), 'waitTime' (total seconds checkouts spent waiting for an
+        open connection to be checked in) and 'maxWait' (the longest single
+        wait)."""
+
+    def resetCounters():
+        """Reset the statistics counters to zero"""
+
 
 
 
@@ -6,6 +6,8 @@ an individual module to get just those tests."""
 
 allSuites = [
     'test_undo:test_suite',
+    'test_caches:test_suite',
+    'test_sql:test_suite',
     'LDAP:test_suite',
     'transactions:test_suite',
     'xmi:test_suite',
@@ -0,0 +1,68 @@
+"""Cache tests"""
+
+from unittest import TestCase, makeSuite, TestSuite
+from peak.api import *
+from peak.tests import testRoot
+from peak.storage.caches import LRUCache
+
+
+class Item(object):
+    pass
+
+
+class LRUCacheTests(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = LRUCache(
+            testRoot(), maxEntries=2, timeToLive=None, clock=self.clock
+        )
+
+    def clock(self):
+        return self.now
+
+    def testWindow(self):
+        cache = self.cache
+        cache[1] = Item(); cache[2] = Item()
+        self.failUnless(cache.get(1) is not None)   # 1 is now most recent
+        cache[3] = Item()                           # so 2 is pushed out
+        self.assertEqual(cache.evictions, 1)
+        self.failUnless(cache.get(2) is None)
+        self.failIf(cache.get(1) is None or cache.get(3) is None)
+        self.assertEqual((cache.hits, cache.misses), (3,1))
+        self.assertRaises(KeyError, lambda: cache[2])
+
+    def testWeakItemsSurvive(self):
+        cache = self.cache
+        item = Item()
+        cache[1] = item; cache[2] = Item(); cache[3] = Item()
+        self.failUnless(cache.get(1) is item)   # still in use, so still cached
+        del cache[1]
+        self.failIf(1 in cache)
+        cache.clear()
+        self.assertEqual(cache.values(), [])
+
+    def testTimeToLive(self):
+        cache = self.cache
+        cache.timeToLive = 10
+        item = Item()
+        cache[1] = item
+        self.now = 9
+        self.failUnless(cache.get(1) is item)
+        self.now = 10
+        self.failUnless(cache.get(1) is None)
+        self.assertEqual(cache.items(), [])
+
+    def testDefaultLimit(self):
+        self.assertEqual(
+            config.lookup(testRoot(), 'peak.storage.caches.maxEntries'), 1000
+        )
+
+
+TestClasses = (
+    LRUCacheTests,
+)
+
+
+def test_suite():
+    return TestSuite([makeSuite(t,'test') for t in TestClasses])
@@ -0,0 +1,420 @@
+"""SQL connection and cursor tests"""
+
+from unittest import TestCase, makeSuite, TestSuite
+from cStringIO import StringIO
+from array import array
+import os
+from peak.api import *
+from peak.tests import testRoot
+from peak.storage.SQL import SQLConnection, MockSQLConnection
+from peak.storage.SQL import NullConverter, compileRowConverter
+from peak.storage.SQL import normalizeSQL
+from peak.storage.connections import ConnectionPool
+
+
+class ConvertingConnection(MockSQLConnection):
+
+    """Mock connection that does type conversion like a real one"""
+
+    getRowConverter = SQLConnection.getRowConverter.im_func
+    getColumnConverters = SQLConnection.getColumnConverters.im_func
+
+    typeMap = binding.Make(
+        lambda: {'NUMBER': lambda descr,value: int(value)}
+    )
+
+
+def column(name, typeCode=None):
+    return (name, typeCode, None, None, None, None, None)
+
+
+class RowConversionTests(TestCase):
+
+    def setUp(self):
+        self.conn = ConvertingConnection(testRoot(), address=None)
+        storage.begin(self.conn)
+
+    def tearDown(self):
+        storage.abort(self.conn)
+
+    def testCompiledConverter(self):
+        descr = column('x'), column('y')
+        convert = compileRowConverter(
+            [(NullConverter, descr[0]), (lambda d,v: (d[0],v), descr[1])]
+        )
+        self.assertEqual(convert(('a','b')), ['a', ('y','b')])
+        convert = compileRowConverter([(NullConverter, descr[0])], tuple)
+        self.assertEqual(convert(['a']), ('a',))
+
+    def testNoConversionNeeded(self):
+        self.failUnless(
+            self.conn.getRowConverter([column('x'), column('y')]) is None
+        )
+
+    def testColumns(self):
+        descr = column('name','STRING'), column('qty','NUMBER')
+        self.conn.when(
+            'select', data=[('a','1'),('b','2'),('c','3')], description=descr
+        )
+
+        c = self.conn('select', fetchSize=2)
+        batches = list(c.iterBatches((None,'i')))
+        self.assertEqual(batches, [
+            [['a','b'], array('i',[1,2])], [['c'], array('i',[3])]
+        ])
+        self.assertEqual(
+            self.conn('select').fetchColumns(), [['a','b','c'], [1,2,3]]
+        )
+        self.assertRaises(
+            ValueError, self.conn('select').fetchColumns, ('i',)
+        )
+
+        out = StringIO()
+        self.conn('select', fetchSize=2).dumpTo(out, 'copy')
+        self.assertEqual(out.getvalue(), 'a\t1\nb\t2\nc\t3\n')
+
+    def testArraysizePassedThrough(self):
+        self.conn.when('select', data=[('a',),('b',),('c',)])
+        c = self.conn('select')
+        c.arraysize = 2
+        self.assertEqual(c._cursor.arraysize, 2)
+        self.assertEqual(c.arraysize, 2)
+        self.assertEqual(c.fetchmany(), [('a',),('b',)])
+
+    def testRowsConvertedAndTypesCached(self):
+        descr = column('name','STRING'), column('qty','NUMBER')
+        self.conn.when('select', data=[('a','1'),('b','2')], description=descr)
+
+        rows = list(self.conn('select'))
+        self.assertEqual([(r.name,r.qty) for r in rows], [('a',1),('b',2)])
+
+        again = list(self.conn('select'))
+        self.failUnless(type(again[0]) is type(rows[0]))
+        self.failUnless(
+            self.conn.getRowFactory(descr) is self.conn.getRowFactory(descr)
+        )
+
+
+class PoolTests(TestCase):
+
+    def setUp(self):
+        self.root = testRoot()
+        self.now = 0
+        self.pool = ConnectionPool(
+            self.root, minSize=0, maxSize=1, idleTimeout=10,
+            clock=lambda: self.now
+        )
+
+    def mkConn(self):
+        return MockSQLConnection(
+            self.root, address='mockdb://server', usePool=True, pool=self.pool
+        )
+
+    def useConn(self, conn):
+        storage.begin(conn)
+        raw = conn.connection
+        raw.when('*COMMIT')
+        conn.joinTxn()
+        storage.commit(conn)
+        return raw
+
+    def testReuse(self):
+        c1, c2 = self.mkConn(), self.mkConn()
+        raw = self.useConn(c1)
+        self.failIf(c1._hasBinding('connection'))   # released after txn
+        self.failUnless(self.useConn(c2) is raw)
+        stats = self.pool.stats()
+        self.assertEqual(
+            (stats['opened'], stats['reused'], stats['checkins'],
+                stats['idle']),
+            (1, 1, 2, 1)
+        )
+
+    def testNoCheckinInTransaction(self):
+        conn = self.mkConn()
+        conn.connection
+        conn.inTransaction = True   # as if closed with work uncommitted
+        conn.close()
+        self.failIf(conn._hasBinding('connection'))
+        stats = self.pool.stats()
+        self.assertEqual(
+            (stats['checkins'], stats['idle'], stats['open']), (0, 0, 0)
+        )
+
+    def testMaxOpen(self):
+        pool = self.pool
+        pool.maxOpen, pool.checkoutTimeout, pool.pollInterval = 1, 1, .5
+        c1, c2 = self.mkConn(), self.mkConn()
+        r1 = pool.checkout(c1)
+
+        def sleep(secs):
+            self.now += secs
+        pool.sleep = sleep
+        self.assertRaises(exceptions.PoolTimeout, pool.checkout, c2)
+
+        def sleep(secs):
+            self.now += secs
+            pool.checkin(c1, r1)
+        pool.sleep = sleep
+        self.failUnless(pool.checkout(c2) is r1)
+
+        stats = pool.stats()
+        self.assertEqual(
+            (stats['timeouts'], stats['waitTime'], stats['maxWait'],
+                stats['open']),
+            (1, 1.5, 1, 1)
+        )
+
+    def testMaxSizeAndPing(self):
+        c1, c2 = self.mkConn(), self.mkConn()
+        r1, r2 = self.pool.checkout(c1), self.pool.checkout(c2)
+        self.pool.checkin(c1, r1)
+        self.pool.checkin(c2, r2)   # pool is full, so this one is closed
+        self.assertEqual(self.pool.discarded, 1)
+
+        c1._ping = lambda conn: False
+        self.failIf(self.pool.checkout(c1) is r1)
+        self.assertEqual(
+            (self.pool.failedChecks, self.pool.discarded, self.pool.opened),
+            (1, 2, 3)
+        )
+
+    def testIdleTimeout(self):
+        conn = self.mkConn()
+        raw = self.pool.checkout(conn)
+        self.pool.checkin(conn, raw)
+        self.now = 5
+        self.failUnless(self.pool.checkout(conn) is raw)
+        self.pool.checkin(conn, raw)
+        self.now = 15
+        self.failIf(self.pool.checkout(conn) is raw)
+        self.assertEqual(self.pool.discarded, 1)
+
+    def testPoolURL(self):
+        conn = naming.lookup(self.root, 'pool:mockdb://server')
+        self.failUnless(isinstance(conn, MockSQLConnection))
+        self.failUnless(conn.usePool)
+
+
+class FakeLog:
+
+    def __init__(self):
+        self.messages = []
+
+    def warning(self, msg, *args):
+        self.messages.append(msg % args)
+
+
+class StatsTests(TestCase):
+
+    def setUp(self):
+        self.ticks = 0
+        self.log = FakeLog()
+        self.conn = MockSQLConnection(
+            testRoot(), address=None, collectStats=True, slowQueryTime=3,
+            clock=self.clock, slowLog=self.log
+        )
+        storage.begin(self.conn)
+
+    def tearDown(self):
+        storage.abort(self.conn)
+
+    def clock(self):
+        self.ticks += 1
+        return self.ticks
+
+    def testNormalize(self):
+        self.assertEqual(
+            normalizeSQL("select *\n  from t where a='x''y' and b=12.5"),
+            "select * from t where a=? and b=?"
+        )
+
+    def testStatsAndSlowLog(self):
+        self.conn.when(
+            'select 1', data=[(1,),(2,)], description=[column('x')]
+        )
+        self.assertEqual(len(list(self.conn('select 1'))), 2)
+        self.conn.recordQuery('update t', 0.5, failed=True)
+
+        s1, s2 = self.conn.getQueryStats()
+        self.assertEqual(
+            (s1.statement, s1.count, s1.errors, s1.rows, s1.execTime,
+                s1.fetchTime, s1.maxTime),
+            ('select ?', 1, 0, 2, 1, 3, 4)
+        )
+        self.assertEqual((s2.count, s2.errors, s2.execTime), (1, 1, 0.5))
+        self.assertEqual(
+            self.log.messages, ["Slow query (4.000 secs, 2 rows): select 1"]
+        )
+
+        self.conn.resetQueryStats()
+        self.assertEqual(self.conn.getQueryStats(), [])
+
+
+class StatementTests(TestCase):
+
+    def setUp(self):
+        self.conn = MockSQLConnection(testRoot(), address=None)
+        storage.begin(self.conn)
+
+    def tearDown(self):
+        storage.abort(self.conn)
+
+    def testTranslateAndCache(self):
+        sql = "select * from t where a=:a and b=:b and c=':c' and d::int=:a"
+        stmt = self.conn.getStatement(sql)
+        self.assertEqual(
+            stmt.sql,
+            "select * from t where a=? and b=? and c=':c' and d::int=?"
+        )
+        self.assertEqual(stmt.bind({'a':1, 'b':2})[1], (1,2,1))
+        self.failUnless(self.conn.getStatement(sql) is stmt)
+
+    def testFormatStyleLiterals(self):
+        conn = MockSQLConnection(
+            testRoot(), address=None, paramstyle='format'
+        )
+        stmt = conn.getStatement("select * from t where a LIKE 'x%' and b=:b")
+        self.assertEqual(
+            stmt.sql, "select * from t where a LIKE 'x%%' and b=%s"
+        )
+        self.assertEqual(stmt.bind({'b':2})[1], (2,))
+
+        stmt = conn.getStatement("select x % 2 from t where a=:a")
+        self.assertEqual(stmt.sql, "select x %% 2 from t where a=%s")
+
+        # No parameters, so the driver won't substitute (or unescape) them
+        stmt = conn.getStatement("select x % 2 from t where a LIKE 'x%'")
+        self.assertEqual(stmt.sql, "select x % 2 from t where a LIKE 'x%'")
+        self.assertEqual(stmt.bind({}), (stmt.sql, None))
+
+    def testExecuteManyWithoutParams(self):
+        conn = MockSQLConnection(
+            testRoot(), address=None, paramstyle='format'
+        )
+        storage.begin(conn)
+        calls = []
+        def record(db, operation, parameters, provide):
+            calls.append((operation, parameters))
+            return provide
+        conn.when("update t set x=x % 2", callback=record)
+        conn(prepared=True).executemany("update t set x=x % 2", [{}, {}])
+        self.assertEqual(calls, [("update t set x=x % 2", None)] * 2)
+        storage.abort(conn)
+
+    def testNoParams(self):
+        stmt = self.conn.getStatement("select * from t where a LIKE 'x%'")
+        self.assertEqual(stmt.sql, "select * from t where a LIKE 'x%'")
+        self.assertEqual(stmt.bind({}), (stmt.sql, None))
+
+    def testPreparedCursor(self):
+        self.conn.when(
+            "select b from t where a=?", (1,), data=[(2,)],
+            description=[column('b')]
+        )
+        c = self.conn("select b from t where a=:a", {'a':1}, prepared=True)
+        self.assertEqual([r.b for r in c], [2])
+
+
+class StreamingConnection(MockSQLConnection):
+
+    """Mock connection that records the batch sizes of streamed fetches"""
+
+    fetchSizes = binding.Make(list)
+
+    def _streamingCursor(self, conn):
+        cursor = conn.cursor()
+        fetchmany = cursor.fetchmany
+        def fetch(size=None):
+            self.fetchSizes.append(size)
+            return fetchmany(size)
+        cursor.fetchmany = fetch
+        return cursor
+
+
+class StreamingTests(TestCase):
+
+    def setUp(self):
+        self.conn = StreamingConnection(
+            testRoot(), address=None, streamArraySize=2
+        )
+        storage.begin(self.conn)
+        self.conn.when(
+            'select', data=[(i,) for i in range(5)], description=[column('x')]
+        )
+
+    def tearDown(self):
+        storage.abort(self.conn)
+
+    def testStream(self):
+        rows = list(self.conn('select', stream=True))
+        self.assertEqual([r.x for r in rows], range(5))
+        self.assertEqual(self.conn.fetchSizes, [2,2,2,2])
+
+        rows = list(self.conn('select', stream=True, fetchSize=4))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(self.conn.fetchSizes[4:], [4,4,4])
+
+    def testNoStream(self):
+        self.assertEqual(len(list(self.conn('select', fetchSize=3))), 5)
+        self.assertEqual(self.conn.fetchSizes, [])
+
+
+class AsyncTests(TestCase):
+
+    def setUp(self):
+        from peak.events.io_events import Selector
+        from peak.events.thread_pool import ThreadPool
+        self.sched = events.Scheduler()
+        selector = Selector(testRoot(), scheduler=self.sched)
+        selector.monitor
+        pool = ThreadPool(testRoot(), selector=selector, maxThreads=2)
+        self.conn = MockSQLConnection(
+            testRoot(), address=None, threadPool=pool
+        )
+        storage.begin(self.conn)
+        self.conn.when(
+            'select', data=[(i,) for i in range(5)], description=[column('x')]
+        )
+
+    def tearDown(self):
+        storage.abort(self.conn)
+
+    def runTask(self, gen):
+        task = events.Task(gen)
+        for i in range(100):
+            if task.isFinished():
+                break
+            self.sched.tick()
+        else:
+            self.fail("Timed out waiting for async cursor")
+
+    def testFetch(self):
+        log = []
+
+        def gen():
+            cursor = self.conn.asyncCursor(fetchSize=2)
+            yield cursor.execute('select'); events.resume()
+            yield cursor.fetchmany(); log.append(events.resume())
+            yield cursor.fetchmany(1); log.append(events.resume())
+            yield cursor.fetchall(); log.append(events.resume())
+            yield cursor.execute('select'); events.resume()
+            yield cursor.fetchColumns(); log.append(events.resume())
+
+        self.runTask(gen())
+        self.assertEqual([r.x for r in log[0]], [0,1])
+        self.assertEqual([r.x for r in log[1]], [2])
+        self.assertEqual([r.x for r in log[2]], [3,4])
+        self.assertEqual(log[3], [range(5)])
+
+
+TestClasses = (
+    RowConversionTests, PoolTests, StatsTests, StatementTests, StreamingTests,
+)
+
+if hasattr(os,'pipe'):
+    TestClasses += (AsyncTests,)
+
+
+def test_suite():
+    return TestSuite([makeSuite(t,'test') for t in TestClasses])
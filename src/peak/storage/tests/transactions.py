@@ -138,6 +138,17 @@ class ProcrastinatingParticipant(LogParticipant):
         return old
 
 
+class TrackedParticipant(LogParticipant):
+    tracksReadiness = True
+
+class MarkingParticipant(ProcrastinatingParticipant):
+
+    def readyToVote(self, txnService):
+        if not self.status:
+            txnService.markUnready(self.other)
+        return super(MarkingParticipant,self).readyToVote(txnService)
+
+
 class VotingTest(TestCase):
 
     def setUp(self):
@@ -182,6 +193,45 @@ class VotingTest(TestCase):
             [('finish',ts,True)]   * 2
 
 
+    def checkTracked(self):
+
+        ts = self.ts
+        tracked = TrackedParticipant()
+        tracked.log = self.log
+
+        ts.begin()
+        ts.join(self.p_p)
+        ts.join(tracked)
+        ts.commit()
+
+        # the tracked participant isn't asked again, since it's not marked
+        assert self.log == \
+            [('readyToVote',ts)]   * 3 + \
+            [('voteForCommit',ts)] * 2 + \
+            [('commit',ts)]        * 2 + \
+            [('finish',ts,True)]   * 2
+
+        times = ts.getParticipantTimes()
+        self.assertEqual(len(times), 2)
+        self.assertEqual(
+            dict([(id(p),1) for t,p in times]), {id(tracked):1, id(self.p_p):1}
+        )
+
+    def checkMarkUnready(self):
+
+        ts = self.ts
+        tracked = TrackedParticipant()
+        marker = MarkingParticipant()
+        marker.other = tracked
+        tracked.log = marker.log = self.log
+
+        ts.begin()
+        ts.join(marker)
+        ts.join(tracked)
+        ts.commit()
+
+        assert self.log[:4] == [('readyToVote',ts)] * 4
+
     def checkNormal(self):
 
         ts = self.ts
@@ -270,6 +320,23 @@ class Harness(binding.Component):
             self.table.INSERT(Items(a=ob.a,b=ob.b))
             return ob.a
 
+        saveCalls = binding.Make(list)
+
+        def _saveMany(self, obs):
+            self.saveCalls.append([ob._p_oid for ob in obs])
+            for ob in obs:
+                self._save(ob)
+
+        loadBatchSize = 2
+        loadCalls = binding.Make(list)
+
+        def _loadMany(self, oids):
+            self.loadCalls.append(list(oids))
+            return [
+                (row['a'], dict(row.items()))
+                    for row in self.table if row['a'] in oids
+            ]
+
         def _delete_oids(self, oidList):
             for oid in oidList:
                 self.table.DELETE(Items(a=oid))
@@ -408,6 +475,106 @@ class DMTest(TestCase):
 
 
 
+    def checkPreloadMany(self):
+        storage.begin(self.harness)
+        for a in 1,3,5:
+            self.table.INSERT(Items(a=a,b=a+1))
+        cached = self.dm[1]; cached.b     # already loaded, so not reloaded
+        obs = self.dm.preloadMany([1,3,5,7])
+        self.assertEqual(self.dm.loadCalls, [[3,5],[7]])
+        self.assertEqual([ob.b for ob in obs[:3]], [2,4,6])
+        self.failUnless(obs[0] is cached)
+        self.assertEqual(self.dm.loadCalls, [[3,5],[7]])
+        storage.abort(self.harness)
+
+    def checkGhostGroups(self):
+        storage.begin(self.harness)
+        for a in 1,3,5:
+            self.table.INSERT(Items(a=a,b=a+1))
+        ghosts = [self.dm[1], self.dm[3], self.dm[5]]
+        storage.preloadGhosts(ghosts)
+        self.assertEqual(self.dm.loadCalls, [])
+        self.assertEqual(ghosts[1].b, 4)
+        self.assertEqual(self.dm.loadCalls, [[3,1],[5]])
+        self.assertEqual([ob.b for ob in ghosts], [2,4,6])
+        self.assertEqual(self.dm.loadCalls, [[3,1],[5]])
+        storage.abort(self.harness)
+
+
+    def checkPreloadWithoutReset(self):
+        # Batch-loaded states for ghosts that weren't activated are dropped
+        # at the end of the transaction, even if the DM doesn't reset states
+        dm = self.dm
+        dm.resetStatesAfterTxn = False
+        storage.begin(self.harness)
+        for a in 1,3:
+            self.table.INSERT(Items(a=a,b=a+1))
+        ghost = dm[3]
+        dm.preloadMany([1,3])
+        ghosts = [dm[1], ghost]
+        storage.preloadGhosts(ghosts)
+        storage.commit(self.harness)
+
+        self.failIf(dm._preloaded or dm._ghostGroups)
+
+        storage.begin(self.harness)
+        self.table.SET(Items(a=3),Items(b=40))
+        self.assertEqual(ghost.b, 40)
+        storage.abort(self.harness)
+
+
+    def checkBatchedFlush(self):
+        storage.begin(self.harness)
+        for a in 1,3,5:
+            self.table.INSERT(Items(a=a,b=a+1))
+        for a in 1,3,5:
+            self.dm[a].b = a*10
+        ob = self.dm.newItem()
+        ob.a, ob.b = 7, 70
+        self.dm.flush()
+        self.assertEqual(len(self.dm.saveCalls), 1)
+        saved = self.dm.saveCalls[0]; saved.sort()
+        self.assertEqual(saved, [1,3,5])
+        rows = self.table.dump(); rows.sort()
+        self.assertEqual(rows, [(1,10),(3,30),(5,50),(7,70)])
+        self.failUnless(self.dm[7] is ob)
+        storage.abort(self.harness)
+
+
+    def checkStateCache(self):
+        dm = self.dm
+        dm.stateCache = {}
+        self._addData()
+        self.table.INSERT(Items(a=3,b=4))
+        storage.commit(self.harness)
+
+        for i in range(2):
+            # Later transactions reuse the states loaded by the first
+            storage.begin(self.harness)
+            self.assertEqual([ob.b for ob in dm.preloadMany([1,3])], [2,4])
+            self.assertEqual(dm.loadCalls, [[1,3]])
+            storage.commit(self.harness)
+
+        # Writing through the DM invalidates a state
+        storage.begin(self.harness)
+        dm[1].b = 20
+        dm.flush()
+        self.assertEqual(dm.preloadMany([3])[0].b, 4)
+        storage.commit(self.harness)
+
+        storage.begin(self.harness)
+        self.assertEqual([ob.b for ob in dm.preloadMany([1,3])], [20,4])
+        self.assertEqual(dm.loadCalls, [[1,3],[1]])
+        storage.commit(self.harness)
+
+        # So does a change of version
+        dm._stateVersion = lambda: 2
+        storage.begin(self.harness)
+        self.assertEqual([ob.b for ob in dm.preloadMany([1,3])], [20,4])
+        self.assertEqual(dm.loadCalls, [[1,3],[1],[1,3]])
+        storage.commit(self.harness)
+
+
     def checkKeyDupe(self):
         storage.begin(self.harness)
         ob1 = self.dm.defaultClass(a=1,b=2)
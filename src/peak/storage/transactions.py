@@ -126,10 +126,13 @@ class TransactionState(binding.Component):
     """Helper object representing a single transaction's state"""
 
     participants = binding.Make(list)
+    members      = binding.Make(dict)   # id(participant) -> participant
     info         = binding.Make(dict)
+    times        = binding.Make(dict)   # id(participant) -> [secs,participant]
     timestamp    = None
     safeToJoin   = True
     cantCommit   = False
+    repoll       = None     # participants to re-poll, while preparing
 
 
 
@@ -155,8 +158,14 @@ class TransactionService(binding.Component):
 
         elif self.state.safeToJoin:
 
-            if participant not in self.state.participants:
-                self.state.participants.append(participant)
+            state = self.state
+            if id(participant) not in state.members:
+                state.members[id(participant)] = participant
+                state.participants.append(participant)
+
+                if state.repoll is not None:
+                    # joined during prepare, so make sure it gets polled
+                    state.repoll[id(participant)] = participant
 
         else:
             raise exceptions.TransactionInProgress
@@ -166,41 +175,103 @@ class TransactionService(binding.Component):
 
         """Get votes from all participants
 
-        Ask all participants if they're ready to vote, up to N+1 times (where
-        N is the number of participants), until all agree they are ready, or
-        an exception occurs.  N+1 iterations is sufficient for any acyclic
+        Ask participants if they're ready to vote, up to N+1 times (where N is
+        the number of participants), until all agree they are ready, or an
+        exception occurs.  N+1 iterations is sufficient for any acyclic
         structure of cascading data managers.  Any more than that, and either
         there's a cascade cycle or a broken participant is always returning a
         false value from its readyToVote() method.
 
+        After the first pass, a participant that was ready is only asked
+        again if some participant did work in the previous pass, and either
+        the participant doesn't have a true 'tracksReadiness' attribute, or
+        it has called 'markUnready()' since it was asked.  Participants that
+        join during this process are always asked.
+
         Once all participants are ready, ask them all to vote."""
 
         tries = 0
-        unready = True
         state = self.state
+        pending = state.participants
+        timed = self._timed
 
-        while unready and tries <= len(state.participants):
-            unready = [p for p in state.participants if not p.readyToVote(self)]
-            tries += 1
+        while pending and tries <= len(state.participants):
 
-        if unready:
-            raise exceptions.NotReadyError(unready)
+            state.repoll = {}
+            unready = []
+
+            for p in pending:
+                if not timed(p, p.readyToVote):
+                    unready.append(p)
+
+            tries += 1
+            repoll, state.repoll = state.repoll, None
+
+            if unready:
+                # Someone did work, so anything could have changed, except
+                # for participants that tell us when they have more to do
+                for p in unready:
+                    repoll[id(p)] = p
+                pending = [
+                    p for p in state.participants
+                        if id(p) in repoll
+                        or not getattr(p,'tracksReadiness',False)
+                ]
+            else:
+                pending = [
+                    p for p in state.participants if id(p) in repoll
+                ]
+
+        if pending:
+            raise exceptions.NotReadyError(pending)
 
 
         self.state.safeToJoin = False
 
         for p in state.participants:
             try:
-                p.voteForCommit(self)
+                timed(p, p.voteForCommit)
             except:
                 self.errorHandler.voteFailed(self,p)
 
         return True
 
 
+    def markUnready(self, participant):
+        """See 'storage.ITransactionService.markUnready()'"""
+        repoll = self.state.repoll
+        if repoll is not None:
+            repoll[id(participant)] = participant
+
 
+    def _timed(self, participant, method):
 
+        """Call 'method(self)', adding elapsed time to 'participant's total"""
 
+        start = time()
+        try:
+            return method(self)
+        finally:
+            times = self.state.times
+            key = id(participant)
+            if key in times:
+                times[key][0] += time() - start
+            else:
+                times[key] = [time() - start, participant]
+
+
+    lastTimes = binding.Make(dict)  # 'state.times' of the last transaction
+
+    def getParticipantTimes(self):
+        """See 'storage.ITransactionService.getParticipantTimes()'"""
+        if self.isActive():
+            times = self.state.times
+        else:
+            times = self.lastTimes
+        times = [tuple(t) for t in times.values()]
+        times.sort()
+        times.reverse()
+        return times
 
 
     def begin(self, **info):
@@ -222,9 +293,11 @@ class TransactionService(binding.Component):
 
         self._prepare()
 
+        timed = self._timed
+
         for p in self.state.participants:
             try:
-                p.commitTransaction(self)
+                timed(p, p.commitTransaction)
             except:
                 self.errorHandler.commitFailed(self,p)
 
@@ -242,6 +315,7 @@ class TransactionService(binding.Component):
 
     def removeParticipant(self,participant):
         self.state.participants.remove(participant)
+        del self.state.members[id(participant)]
 
 
     def abort(self):
@@ -293,6 +367,7 @@ class TransactionService(binding.Component):
             except:
                 self.errorHandler.finishFailed(self,p,committed)
 
+        self.lastTimes = self.state.times
         del self.state
 
 
@@ -301,7 +376,7 @@ class TransactionService(binding.Component):
 
 
     def __contains__(self,ob):
-        return ob in self.state.participants
+        return id(ob) in self.state.members
 
 
 
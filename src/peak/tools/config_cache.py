@@ -0,0 +1,48 @@
+"""Implements the 'peak compile-config' command"""
+
+from peak.api import *
+from peak.running.commands import AbstractCommand, InvocationError
+from peak.config.ini_files import CACHE_ENVIRON, writeConfigCache
+import os
+
+
+class CompileConfig(AbstractCommand):
+
+    usage = """Usage: peak compile-config [file1 file2...]
+
+Precompile configuration files into the directory named by the
+PEAK_CONFIG_CACHE environment variable, so that processes run with the same
+PEAK_CONFIG_CACHE setting can load them without parsing them.  With no
+arguments, 'peak.ini' and the files listed in PEAK_CONFIG are compiled.
+
+Files are recompiled automatically when they change, and files that are
+loaded but weren't precompiled (e.g. those included via '[Load Settings
+From]') are compiled when first used, if the cache directory is writable.
+Running this command at deployment time just saves the first process from
+having to do it."""
+
+    def _run(self):
+
+        if not os.environ.get(CACHE_ENVIRON):
+            raise InvocationError("%s is not set" % CACHE_ENVIRON)
+
+        files = self.argv[1:]
+
+        if not files:
+            files = [config.packageFile('peak.core','peak.ini')] + [
+                f for f in os.environ.get('PEAK_CONFIG','').split(os.pathsep)
+                    if f
+            ]
+
+        for file in files:
+            factory = config.getStreamFactory(self, file)
+            path = writeConfigCache(factory)
+            if path is None:
+                print >>self.stderr, "%s: not a local file, skipped" % (
+                    factory.address
+                )
+            else:
+                print >>self.stdout, "%s -> %s" % (factory.address, path)
+
+        return 0
+
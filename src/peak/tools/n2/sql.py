@@ -759,6 +759,53 @@ default for src is '!.', the current input buffer"""
     cmd_styles = binding.Make(cmd_styles)
 
 
+
+    class cmd_stats(ShellCommand):
+        """\\stats [-r] [on|off] -- show SQL statement timing statistics
+
+-r\t\treset statistics after showing them
+on\t\tstart collecting statistics for this connection
+off\t\tstop collecting statistics for this connection"""
+
+        args = ('r', 0, 1)
+
+        def cmd(self, cmd, opts, args, stdout, stderr, **kw):
+            con = self.interactor.con
+
+            if args:
+                if args[0] not in ('on', 'off'):
+                    print >>stderr, "%s: expected 'on' or 'off'" % cmd
+                    return
+                con.collectStats = args[0]=='on'
+                con.timeQueries = con.collectStats or \
+                    con.slowQueryTime is not None
+                return
+
+            stats = con.getQueryStats()
+            if not stats:
+                if not con.collectStats:
+                    print >>stderr, \
+                        "%s: not collecting statistics (use '%s on')" % (
+                            cmd, cmd
+                        )
+                return
+
+            print >>stdout, "%7s %6s %8s %10s %10s %10s  %s" % (
+                'count', 'errors', 'rows', 'exec', 'fetch', 'max',
+                'statement'
+            )
+            for s in stats:
+                print >>stdout, "%7d %6d %8d %10.3f %10.3f %10.3f  %s" % (
+                    s.count, s.errors, s.rows, s.execTime, s.fetchTime,
+                    s.maxTime, s.statement
+                )
+
+            if '-r' in opts:
+                con.resetQueryStats()
+
+    cmd_stats = binding.Make(cmd_stats)
+
+
     class cmd_describe(ShellCommand):
         """\\describe [-d delim] [-m style] [-h] [-f] [-v] [name] -- describe objects in database, or named object
 
@@ -0,0 +1,92 @@
+"""Monotonic clock for timeouts that shouldn't follow wall-clock changes
+
+'monotonic()' returns a number of seconds, as a float, from an arbitrary
+starting point.  Unlike 'time.time()', its value never goes backwards, so
+intervals measured with it aren't affected when the system clock is stepped
+(e.g. by NTP or an administrator).  Its values are only meaningful relative
+to each other, so never compare them with 'time.time()' values.
+
+The best available source is used: 'time.monotonic()' if it exists, or
+'clock_gettime(CLOCK_MONOTONIC)' on Linux (via 'ctypes'), or
+'GetTickCount()' on Windows.  If none of these is available, 'monotonic()'
+falls back to 'time.time()', adjusted to hide backward steps.  Forward steps
+can't be detected in that case; 'HAVE_MONOTONIC' is false if this fallback
+is in use.
+"""
+
+__all__ = ['monotonic', 'HAVE_MONOTONIC']
+
+import sys, time
+
+
+def _steady(time=time.time, state=[0.0, 0.0]):
+    """Fallback clock: 'time.time()', but compensated for backward jumps"""
+    now = time() + state[1]
+    if now < state[0]:
+        state[1] += state[0] - now  # clock went back; add it to the offset
+        now = state[0]
+    state[0] = now
+    return now
+
+
+def _linuxMonotonic():
+    import ctypes, ctypes.util
+
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    lib = ctypes.CDLL(
+        ctypes.util.find_library('rt') or ctypes.util.find_library('c')
+    )
+    clock_gettime = lib.clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    CLOCK_MONOTONIC = 1
+    ts = timespec()
+    tsp = ctypes.pointer(ts)
+
+    if clock_gettime(CLOCK_MONOTONIC, tsp):
+        raise OSError("clock_gettime(CLOCK_MONOTONIC) failed")
+
+    def monotonic():
+        clock_gettime(CLOCK_MONOTONIC, tsp)
+        return ts.tv_sec + ts.tv_nsec * 1e-9
+
+    return monotonic
+
+
+def _windowsMonotonic():
+    import ctypes
+    GetTickCount = ctypes.windll.kernel32.GetTickCount
+    GetTickCount.restype = ctypes.c_uint32
+    state = [0, 0]  # last tick count, number of 32-bit wraparounds
+
+    def monotonic():
+        ticks = GetTickCount()
+        if ticks < state[0]:
+            state[1] += 1
+        state[0] = ticks
+        return (ticks + (state[1] << 32)) / 1000.0
+
+    return monotonic
+
+
+def _findMonotonic():
+
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+
+    try:
+        if sys.platform.startswith('linux'):
+            return _linuxMonotonic()
+        elif sys.platform=='win32':
+            return _windowsMonotonic()
+    except (ImportError, OSError, AttributeError):
+        pass
+
+
+monotonic = _findMonotonic()
+HAVE_MONOTONIC = monotonic is not None
+
+if not HAVE_MONOTONIC:
+    monotonic = _steady
@@ -0,0 +1,254 @@
+"""Find out where the time goes when a PEAK process starts up
+
+To profile a command's startup, set the 'PEAK_PROFILE_STARTUP' environment
+variable to '-' (to report on 'sys.stderr') or to a filename (to append the
+report to that file)::
+
+    PEAK_PROFILE_STARTUP=- peak somecommand args...
+
+or use the 'peak' script's '--profile-startup' option (which can't time the
+imports done before the option is seen, though)::
+
+    peak --profile-startup somecommand args...
+
+While profiling is on, the time spent in each of these is recorded:
+
+    'import' -- importing a module (by the name imported)
+
+    'lazy' -- loading a 'lazyModule()' (or other 'reload()' call)
+
+    'ini' -- loading a configuration file (by its URL)
+
+    'rule' -- computing a setting defined in a configuration file (by the
+    file, line number, and property name of the setting)
+
+    'assembly' -- activating a 'binding.Make(uponAssembly=True)' attribute
+    (by component path, class, and attribute name)
+
+    'naming' -- a 'naming.lookup()' (by the name looked up)
+
+When the process exits (or 'stop()' is called), a report is written listing
+the most expensive items, sorted by their "own" time: the time spent in an
+item, less the time spent in items nested inside it.  The report also shows
+each item's total time and the number of times it occurred, and the total
+own time for each kind of item.
+
+Other code can time itself in the same way::
+
+    from peak.util import startup_profile
+
+    profiler = startup_profile.profiler
+    if profiler is not None:
+        profiler.begin('mykind', label)
+    try:
+        doSomething()
+    finally:
+        if profiler is not None:
+            profiler.end()
+
+This module doesn't import any other part of PEAK, so that it can be used
+before PEAK itself is imported.
+"""
+
+import sys, os, time, __builtin__
+
+try:
+    from thread import get_ident
+except ImportError:
+    get_ident = lambda: None
+
+__all__ = [
+    'StartupProfiler', 'profiler', 'start', 'stop', 'startFromEnviron',
+]
+
+ENVIRON_VAR = 'PEAK_PROFILE_STARTUP'
+
+profiler = None     # the active 'StartupProfiler', if profiling is on
+
+
+class StartupProfiler(object):
+
+    """Record the time spent in nested, labelled phases of startup
+
+    Only phases in the thread that created the profiler are recorded."""
+
+    def __init__(self, clock=time.time, stream=None):
+        self.clock = clock
+        self.stream = stream
+        self.thread = get_ident()
+        self.started = clock()
+        self.stack = []
+        self.totals = {}    # (kind,label) -> [count, totalTime, ownTime]
+
+
+    def begin(self, kind, label):
+        """Start timing an occurrence of 'label' (a kind of 'kind')"""
+        if get_ident()==self.thread:
+            self.stack.append([kind, label, self.clock(), 0.0])
+
+
+    def end(self):
+
+        """Finish timing the most recently begun occurrence"""
+
+        if get_ident()!=self.thread:
+            return
+
+        kind, label, start, nested = self.stack.pop()
+        elapsed = self.clock() - start
+
+        if self.stack:
+            self.stack[-1][3] += elapsed
+
+        totals = self.totals.get((kind,label))
+        if totals is None:
+            totals = self.totals[kind,label] = [0, 0.0, 0.0]
+
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] += elapsed - nested
+
+
+    def timed(self, kind, label, func):
+        """Return a wrapper for 'func' that times each call as 'label'"""
+        def wrapper(*args, **kw):
+            self.begin(kind, label)
+            try:
+                return func(*args, **kw)
+            finally:
+                self.end()
+        return wrapper
+
+
+    def installHooks(self):
+        """Start timing imports and 'reload()' calls"""
+        self._import = __builtin__.__import__
+        self._reload = __builtin__.reload
+        __builtin__.__import__ = self.timedImport
+        __builtin__.reload = self.timedReload
+
+
+    def removeHooks(self):
+        """Stop timing imports and 'reload()' calls"""
+        if __builtin__.__import__ == self.timedImport:
+            __builtin__.__import__ = self._import
+        if __builtin__.reload == self.timedReload:
+            __builtin__.reload = self._reload
+
+
+    def timedImport(self, name, *args, **kw):
+
+        if name in sys.modules and not (args[2:3] or kw.get('fromlist')):
+            # Already imported, and no 'fromlist' that might import more
+            return self._import(name, *args, **kw)
+
+        self.begin('import', name)
+        try:
+            return self._import(name, *args, **kw)
+        finally:
+            self.end()
+
+
+    def timedReload(self, module):
+        self.begin('lazy', getattr(module,'__name__',module))
+        try:
+            return self._reload(module)
+        finally:
+            self.end()
+
+
+    def report(self, stream, limit=50):
+
+        """Write a report of the 'limit' most expensive items to 'stream'"""
+
+        elapsed = self.clock() - self.started
+        items = [
+            (own, total, count, kind, label)
+                for (kind,label), (count,total,own) in self.totals.items()
+        ]
+        items.sort()
+        items.reverse()
+
+        byKind = {}
+        for own, total, count, kind, label in items:
+            byKind[kind] = byKind.get(kind,0.0) + own
+
+        kinds = [(own,kind) for kind,own in byKind.items()]
+        kinds.sort()
+        kinds.reverse()
+        kinds.append((elapsed-sum(byKind.values()), '(other)'))
+
+        print >>stream, "Startup profile (%.3f secs):" % elapsed
+        print >>stream
+
+        for own, kind in kinds:
+            print >>stream, "    %-10s %8.3f secs" % (kind, own)
+
+        print >>stream
+        print >>stream, "     Own     Total   Count  Kind      What"
+
+        for own, total, count, kind, label in items[:limit]:
+            print >>stream, "%8.4f  %8.4f  %6d  %-8s  %s" % (
+                own, total, count, kind, label
+            )
+
+        if len(items)>limit:
+            print >>stream, "(%d more items not shown)" % (len(items)-limit)
+
+
+
+
+
+
+
+
+
+
+def start(stream=None):
+
+    """Turn on startup profiling, if it's not already on
+
+    The report is written to 'stream' (default: 'sys.stderr') when the
+    process exits, unless 'stop()' is called first.  Returns the active
+    'StartupProfiler'."""
+
+    global profiler
+
+    if profiler is None:
+        profiler = StartupProfiler(stream=stream)
+        profiler.installHooks()
+        import atexit
+        atexit.register(stop)
+
+    return profiler
+
+
+def stop(stream=None):
+
+    """Turn off startup profiling (if it's on) and write the report
+
+    The report goes to 'stream', or the stream given to 'start()', or
+    'sys.stderr'."""
+
+    global profiler
+    p, profiler = profiler, None
+
+    if p is not None:
+        p.removeHooks()
+        p.report(stream or p.stream or sys.stderr)
+
+
+def startFromEnviron(environ=os.environ):
+
+    """Turn on profiling if the 'PEAK_PROFILE_STARTUP' variable is set
+
+    If it's '-', the report goes to 'sys.stderr'; otherwise it's appended to
+    the named file."""
+
+    value = environ.get(ENVIRON_VAR)
+
+    if value=='-':
+        start()
+    elif value:
+        start(open(value,'a'))
+
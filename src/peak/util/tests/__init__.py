@@ -14,6 +14,8 @@ allSuites = [
     'test_mockets:test_suite',
     'test_signature:test_suite',
     'test_conflict:test_suite',
+    'test_monotonic:test_suite',
+    'test_startup_profile:test_suite',
     'peak.util.tests:test_unittrace',
     'peak.util.tests:test_Graph',
 ]
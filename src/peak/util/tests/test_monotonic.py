@@ -0,0 +1,33 @@
+"""Tests for peak.util.monotonic"""
+
+from unittest import TestCase, makeSuite, TestSuite
+from peak.util import monotonic
+
+
+class MonotonicTests(TestCase):
+
+    def checkNeverDecreases(self):
+        last = monotonic.monotonic()
+        for i in range(1000):
+            now = monotonic.monotonic()
+            assert now >= last, (now, last)
+            last = now
+
+    def checkSteadyFallback(self):
+        clock = [100.0]
+        state = [0.0, 0.0]
+        steady = lambda: monotonic._steady(lambda: clock[0], state)
+
+        self.assertEqual(steady(), 100.0)
+        clock[0] = 40.0     # clock stepped back by a minute
+        self.assertEqual(steady(), 100.0)
+        clock[0] = 45.0
+        self.assertEqual(steady(), 105.0)
+
+
+TestClasses = (
+    MonotonicTests,
+)
+
+def test_suite():
+    return TestSuite([makeSuite(t,'check') for t in TestClasses])
@@ -0,0 +1,67 @@
+"""Tests for peak.util.startup_profile"""
+
+from unittest import TestCase, makeSuite, TestSuite
+from peak.util.startup_profile import StartupProfiler
+from cStringIO import StringIO
+
+
+class ProfilerTests(TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.profiler = StartupProfiler(clock=lambda: self.now[0])
+
+    def tick(self, secs):
+        self.now[0] += secs
+
+    def checkNesting(self):
+        p = self.profiler
+        p.begin('ini', 'peak.ini')
+        self.tick(1)
+        p.begin('import', 'foo')
+        self.tick(2)
+        p.end()
+        self.tick(1)
+        p.end()
+        self.assertEqual(p.totals, {
+            ('ini','peak.ini'): [1, 4.0, 2.0],
+            ('import','foo'):   [1, 2.0, 2.0],
+        })
+
+    def checkTimed(self):
+        p = self.profiler
+        def f(x):
+            self.tick(x)
+            return x*2
+        f = p.timed('rule', 'peak.ini:1 (x)', f)
+        self.assertEqual(f(1), 2)
+        self.assertEqual(f(x=2), 4)
+        self.assertEqual(p.totals, {('rule','peak.ini:1 (x)'): [2, 3.0, 3.0]})
+        self.assertEqual(p.stack, [])
+
+    def checkReport(self):
+        p = self.profiler
+        p.begin('naming', 'config:foo')
+        self.tick(3)
+        p.end()
+        p.begin('assembly', '/app (App.server)')
+        self.tick(5)
+        p.end()
+        self.tick(2)
+        s = StringIO()
+        p.report(s)
+        lines = s.getvalue().split('\n')
+        self.assertEqual(lines[0], "Startup profile (10.000 secs):")
+        self.assertEqual(lines[2].split(), ['assembly','5.000','secs'])
+        self.assertEqual(lines[4].split(), ['(other)','2.000','secs'])
+        self.failUnless(lines[7].endswith('/app (App.server)'))
+        self.failUnless(lines[8].endswith('config:foo'))
+
+
+TestClasses = (
+    ProfilerTests,
+)
+
+def test_suite():
+    return TestSuite([makeSuite(t,'check') for t in TestClasses])
+